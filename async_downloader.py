@@ -0,0 +1,183 @@
+import asyncio #pipeline
+import threading #cancel event
+import time #stage timings
+from collections import namedtuple #end of feed markers
+from rss_downloader import RSSDownloader
+from feed_stream import iter_entries #lazy feed parsing
+from feed_health import CircuitOpen #skipped feeds
+
+# bounded queues between the stages, a full queue pauses the stage feeding it
+QUEUE_SIZE = 256
+# fetched feed bodies waiting to be parsed, kept small since every item is a whole document
+BODY_QUEUE_SIZE = 4
+
+# sent after the last entry of a feed, so later stages know it was fully scanned
+FeedDone = namedtuple('FeedDone', ['feed', 'scan_key', 'newest_id'])
+# sent once a stage ran out of input
+_END = object()
+
+
+class AsyncRSSDownloader(RSSDownloader):
+
+    def __init__(self, base_dir: str = None, queue_size: int = QUEUE_SIZE):
+        """
+        An RSSDownloader whose download() is a coroutine, for asyncio applications such as the Telegram bot.
+
+        A cycle runs as a pipeline of stages, fetch -> parse -> match -> dedup -> deliver,
+        connected by bounded asyncio queues: entries are matched while later entries are still parsed
+        and other feeds are still downloading, and a slow stage holds back the ones before it.
+        Network I/O and delivery run on executor threads, so the event loop never blocks on them.
+
+        Config is only locked while a cycle takes its snapshot of the feeds and the watchlist and while
+        it is edited, so add_item_to_watchlist(), get_watchlist() and the other methods of RSSDownloader
+        never wait for a running cycle.
+
+        Methods
+        -------
+        download(cancel_event, dry_run)
+            Coroutine running a downloading cycle exactly once,
+            returns a list of downloaded items
+        """
+        super().__init__(base_dir)
+        self._queue_size = queue_size
+        # cycles of this instance never overlap
+        self._cycle_guard = asyncio.Lock()
+
+    async def download(self, cancel_event: threading.Event = None, dry_run: bool = False) -> list:
+        # setting cancel_event stops the cycle before its next feed or before delivery
+        # a dry run matches and deduplicates but delivers and remembers nothing, see get_last_cycle()
+        async with self._cycle_guard:
+            self._metrics.begin_cycle()
+            feeds, matchers, backends = self._cycle_snapshot()
+
+            bodies = asyncio.Queue(BODY_QUEUE_SIZE)
+            entries = asyncio.Queue(self._queue_size)
+            matched = asyncio.Queue(self._queue_size)
+
+            stages = [asyncio.ensure_future(stage) for stage in (
+                self._fetch_stage(feeds, matchers, bodies),
+                self._parse_stage(bodies, entries, cancel_event),
+                self._match_stage(matchers, entries, matched),
+                self._dedup_stage(backends, matched))]
+            try:
+                *_, (pending, scanned_feeds) = await asyncio.gather(*stages)
+            finally:
+                # a failed or cancelled stage must not leave the others waiting on their queues
+                for stage in stages:
+                    stage.cancel()
+
+            if cancel_event is not None and cancel_event.is_set():
+                self._logger.info("Download cycle cancelled")
+                self._metrics.count('cancelled')
+                self._last_cycle = self._cycle_report(pending, set(), self._metrics.end_cycle(), cancelled=True)
+                return list()
+
+            if dry_run:
+                self._logger.info("Dry run, nothing was delivered")
+                self._last_cycle = self._cycle_report(pending, set(), self._metrics.end_cycle(), dry_run=True)
+                return list()
+
+            loop = asyncio.get_running_loop()
+            downloaded_items, failed_links = await loop.run_in_executor(None, self._deliver, pending, scanned_feeds)
+            await loop.run_in_executor(None, self._housekeep, bool(downloaded_items))
+            self._last_cycle = self._cycle_report(pending, failed_links, self._metrics.end_cycle())
+
+        return downloaded_items
+
+    async def _fetch_stage(self, feeds, matchers, out):
+        """ Fetches every feed concurrently, passing on (feed, scan_key, body) of changed feeds as they arrive """
+        import requests #fetch errors
+        loop = asyncio.get_running_loop()
+
+        async def fetch(feed):
+            scan_key = self._scan_key(feed, matchers)
+            try:
+                body = await asyncio.wait_for(loop.run_in_executor(self._feed_pool, self._fetch_body, feed, scan_key),
+                                              feed.timeout)
+            except asyncio.TimeoutError:
+                self._logger.error(f"Timed out fetching {feed.url}")
+                self._metrics.count('feed_timeouts')
+                return
+            except CircuitOpen:
+                return
+            except requests.RequestException as e:
+                self._logger.error(f"Could not fetch {feed.url}: {e}")
+                self._metrics.count('feed_errors')
+                return
+
+            # nothing changed since the last scan with this watchlist
+            if body is None:
+                self._metrics.count('feeds_unchanged')
+            else:
+                await out.put((feed, scan_key, body))
+
+        await asyncio.gather(*(fetch(feed) for feed in feeds))
+        await out.put(_END)
+
+    async def _parse_stage(self, bodies, out, cancel_event):
+        """ Parses feed bodies into (feed, entry) items, up to the newest entry of the previous scan """
+        while (item := await bodies.get()) is not _END:
+            # a cancelled cycle keeps draining bodies so the fetch stage can finish
+            if cancel_event is not None and cancel_event.is_set():
+                continue
+
+            feed, scan_key, body = item
+            scanned = 0
+            newest_id = ''
+            for entry in self._timed_entries(iter_entries(body, stop_at=self._feed_cache.newest_id(feed.url, scan_key))):
+                scanned += 1
+                newest_id = newest_id or entry.get('id', '')
+                await out.put((feed, entry))
+            self._metrics.count('entries_scanned', scanned)
+            await out.put(FeedDone(feed, scan_key, newest_id))
+
+        await out.put(_END)
+
+    async def _match_stage(self, matchers, entries, out):
+        """ Passes on (feed, entry_key, entry, matches) for entries matching the watchlist and the rules of their feed """
+        match_seconds = 0.0
+        while (item := await entries.get()) is not _END:
+            if isinstance(item, FeedDone):
+                await out.put(item)
+                continue
+
+            start = time.perf_counter()
+            feed, entry = item
+            matches = self._match(matchers[feed.has_dots], entry.title)
+            wanted = matches and self._check_rules(feed.must_contain, entry.title)
+            match_seconds += time.perf_counter() - start
+            if wanted:
+                await out.put((feed, self._entry_key(entry), entry, matches))
+
+        self._metrics.add_time('match', match_seconds)
+        await out.put(_END)
+
+    async def _dedup_stage(self, backends, matched):
+        """
+        Drops entries that were handled before, grouping the rest by delivery backend.
+        Returns ({backend: [(feed, entry_key, entry, matches)]}, [(feed, scan_key, newest_id)]).
+        """
+        pending = dict()
+        scanned_feeds = list()
+        # entries published by several feeds are only taken once per cycle
+        cycle_keys = set()
+        cycle_episodes = dict()
+        dedup_seconds = 0.0
+
+        while (item := await matched.get()) is not _END:
+            if isinstance(item, FeedDone):
+                scanned_feeds.append(tuple(item))
+                continue
+
+            start = time.perf_counter()
+            feed, entry_key, entry, matches = item
+            if entry_key not in cycle_keys:
+                matches = self._dedup(entry_key, entry, matches, cycle_episodes)
+                if matches:
+                    cycle_keys.add(entry_key)
+                    self._logger.info(f"Found new entry of {matches[0][0].title()}")
+                    pending.setdefault(backends[feed.name], list()).append((feed, entry_key, entry, matches))
+            dedup_seconds += time.perf_counter() - start
+
+        self._metrics.add_time('dedup', dedup_seconds)
+        return pending, scanned_feeds
@@ -0,0 +1,180 @@
+"""
+Offline benchmark of a full RSSDownloader.download() cycle.
+
+Feeds, .torrent files, the qBittorrent Web API and a JSON-RPC client are
+served by a local stub server and every run uses a fresh temp base directory, so nothing
+leaves the machine. For every watchlist size x feed size it reports the
+latency of a cold cycle (full parse, match and delivery) and of a warm
+cycle (unchanged feed), of a delta cycle (a few new entries on top of the
+feed), the matcher throughput, the number of stat calls
+and the peak Python memory of the cold cycle.
+
+Usage: python benchmarks/bench_cycle.py [--items 10,100,1000] [--entries 100,1000]
+                                        [--feeds N] [--method torrent|magnet|watch|jsonrpc]
+                                        [--engine sync|async] [--recorded FILE]
+"""
+import argparse #cli args
+import asyncio #async engine
+import os #repo path, stat counting
+import sys #import path
+import time #timing
+import random #seeded generators
+import logging #quiet logs
+import tempfile #base dirs
+import tracemalloc #peak memory
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rss_downloader
+import async_downloader
+from config_store import ConfigStore
+from benchmarks.stubs import StubServer, make_watchlist, make_titles, make_feed
+
+
+class StatCounter:
+    """ Counts os.stat calls, which also covers os.path.isfile/isdir/exists """
+
+    def __init__(self):
+        self.calls = 0
+        self._stat = os.stat
+
+    def __enter__(self):
+        def counting_stat(*args, **kwargs):
+            self.calls += 1
+            return self._stat(*args, **kwargs)
+        os.stat = counting_stat
+        return self
+
+    def __exit__(self, *exc):
+        os.stat = self._stat
+
+
+def setup(base_dir, server, watchlist, feed_paths, method, engine):
+    # the first instance writes the default config.ini
+    rss_downloader.RSSDownloader(base_dir)
+    config = ConfigStore(f"{base_dir}/config.ini")
+    with config.batch():
+        config.remove_option('WATCHLIST', 'item')
+        for item in watchlist:
+            config.set('WATCHLIST', item, '')
+        for i, path in enumerate(feed_paths):
+            config.set('FEEDS', f"feed{i}", server.url + path)
+        config.set('SETTINGS', 'download_method', 'magnet' if method == 'magnet' else '.torrent file')
+        config.set('SETTINGS', 'qbit_integration', 'yes' if method == 'magnet' else 'no')
+        config.set('SETTINGS', 'qbit_port', str(server.port))
+        config.set('SETTINGS', 'qbit_path', '')
+        config.set('SETTINGS', 'delivery_backend', {'watch' : 'watch_folder', 'jsonrpc' : 'jsonrpc'}.get(method, 'auto'))
+        config.set('SETTINGS', 'rpc_url', f"{server.url}/jsonrpc")
+
+    if engine == 'async':
+        return async_downloader.AsyncRSSDownloader(base_dir)
+    return rss_downloader.RSSDownloader(base_dir)
+
+
+def cycle(downloader, loop):
+    """ Run one download cycle of either engine """
+    if isinstance(downloader, async_downloader.AsyncRSSDownloader):
+        return loop.run_until_complete(downloader.download())
+    return downloader.download()
+
+
+def run_case(server, item_count, entry_count, args, rng, recorded, loop):
+    watchlist = make_watchlist(item_count, rng)
+    feed_paths = list()
+    feed_titles_by_path = dict()
+    titles = list()
+    for i in range(args.feeds):
+        if recorded is not None:
+            body = recorded
+        else:
+            feed_titles = make_titles(watchlist, entry_count, rng, args.hit_rate)
+            titles.extend(feed_titles)
+            body = make_feed(feed_titles, server.url)
+        path = f"/rss/{item_count}-{entry_count}-{i}"
+        if recorded is None:
+            feed_titles_by_path[path] = feed_titles
+        server.feeds[path] = body
+        feed_paths.append(path)
+
+    with tempfile.TemporaryDirectory() as base_dir:
+        downloader = setup(base_dir, server, watchlist, feed_paths, args.method, args.engine)
+        requests_before = server.requests
+
+        with StatCounter() as stats:
+            start = time.perf_counter()
+            downloaded_items = cycle(downloader, loop)
+            cold = time.perf_counter() - start
+        requests_made = server.requests - requests_before
+
+        start = time.perf_counter()
+        cycle(downloader, loop)
+        warm = time.perf_counter() - start
+
+        # a few new releases on top of every feed, the rest was seen by the cold cycle
+        if recorded is None:
+            for path in feed_paths:
+                new_titles = make_titles(watchlist, args.new_entries, rng, args.hit_rate)
+                server.feeds[path] = make_feed(new_titles + feed_titles_by_path[path], server.url)
+        start = time.perf_counter()
+        cycle(downloader, loop)
+        delta = time.perf_counter() - start
+
+        compiled = downloader._get_matcher(False)
+        start = time.perf_counter()
+        for title in titles:
+            downloader._match(compiled, title)
+        throughput = len(titles) / (time.perf_counter() - start) if titles else 0
+
+    # tracing slows the cycle down a lot, so memory is measured on a separate cold cycle
+    with tempfile.TemporaryDirectory() as base_dir:
+        downloader = setup(base_dir, server, watchlist, feed_paths, args.method, args.engine)
+        tracemalloc.start()
+        cycle(downloader, loop)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        return {'items' : item_count, 'entries' : entry_count * args.feeds, 'matches' : len(downloaded_items),
+                'cold_ms' : cold * 1000, 'warm_ms' : warm * 1000, 'delta_ms' : delta * 1000, 'titles_per_s' : throughput,
+                'stat_calls' : stats.calls, 'peak_kib' : peak / 1024,
+                'requests' : requests_made}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", default="10,100,1000", help="comma separated watchlist sizes")
+    parser.add_argument("--entries", default="100,1000", help="comma separated entries per feed")
+    parser.add_argument("--feeds", type=int, default=1, help="feeds polled per cycle")
+    parser.add_argument("--new-entries", type=int, default=5, help="entries added to every feed for the delta cycle")
+    parser.add_argument("--hit-rate", type=float, default=0.05, help="fraction of entries from watched shows")
+    parser.add_argument("--method", choices=['torrent', 'magnet', 'watch', 'jsonrpc'], default='torrent',
+                        help="deliver .torrent files, magnets through the fake qBittorrent API, "
+                             "per-show watch folders or the fake JSON-RPC client")
+    parser.add_argument("--engine", choices=['sync', 'async'], default='sync',
+                        help="RSSDownloader or the AsyncRSSDownloader pipeline")
+    parser.add_argument("--recorded", help="serve this recorded RSS file instead of synthetic feeds")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    recorded = None
+    if args.recorded:
+        with open(args.recorded, 'rb') as recorded_file:
+            recorded = recorded_file.read()
+
+    rng = random.Random(0)
+    server = StubServer()
+    loop = asyncio.new_event_loop()
+    columns = ['items', 'entries', 'matches', 'cold_ms', 'warm_ms', 'delta_ms', 'titles_per_s', 'stat_calls', 'peak_kib', 'requests']
+    print(" ".join(f"{column:>12}" for column in columns))
+    try:
+        for item_count in (int(size) for size in args.items.split(",")):
+            for entry_count in (int(size) for size in args.entries.split(",")):
+                result = run_case(server, item_count, entry_count, args, rng, recorded, loop)
+                print(" ".join(f"{result[column]:>12.1f}" if isinstance(result[column], float)
+                               else f"{result[column]:>12}" for column in columns))
+    finally:
+        loop.close()
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
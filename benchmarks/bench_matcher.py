@@ -0,0 +1,58 @@
+"""
+Compare the compiled WatchlistMatcher against the old item x entry loop.
+
+Usage: python benchmarks/bench_matcher.py [--entries N] [--repeat N]
+"""
+import argparse #cli args
+import os #repo path
+import random #seeded generators
+import sys #import path
+import timeit #timing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from watchlist_matcher import WatchlistMatcher
+from benchmarks.stubs import make_watchlist, make_titles
+
+
+def old_loop(watchlist, titles):
+    found = list()
+    for item, dir_path in watchlist.items():
+        for title in titles:
+            if item in title.lower():
+                found.append((item, title))
+    return found
+
+
+def matcher_loop(matcher, titles):
+    found = list()
+    for title in titles:
+        for item, dir_path in matcher.match(title):
+            found.append((item, title))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=500, help="feed entries per cycle")
+    parser.add_argument("--repeat", type=int, default=5, help="timing repetitions")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'items':>6} {'old loop (ms)':>14} {'matcher (ms)':>13} {'build (ms)':>11} {'speedup':>8}")
+    for size in (10, 100, 1000):
+        watchlist = {item : f"/downloads/{item}/" for item in make_watchlist(size, rng)}
+        titles = make_titles(list(watchlist), args.entries, rng)
+        patterns = {item: (item, path) for item, path in watchlist.items()}
+        matcher = WatchlistMatcher(patterns)
+
+        assert sorted(old_loop(watchlist, titles)) == sorted(matcher_loop(matcher, titles))
+
+        old = min(timeit.repeat(lambda: old_loop(watchlist, titles), number=1, repeat=args.repeat))
+        new = min(timeit.repeat(lambda: matcher_loop(matcher, titles), number=1, repeat=args.repeat))
+        build = min(timeit.repeat(lambda: WatchlistMatcher(patterns), number=1, repeat=args.repeat))
+        print(f"{size:>6} {old * 1000:>14.2f} {new * 1000:>13.2f} {build * 1000:>11.2f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Cold-start cost of the entry points, as paid by cron-style one-shot runs.
+
+Every sample is a fresh interpreter that imports one entry module and, for the
+downloader modules, constructs a downloader in a temp base directory. It reports
+the wall time of the whole process, the import and construction times measured
+inside it, and which heavy third-party modules ended up loaded.
+
+Usage: python benchmarks/bench_startup.py [--repeat N] [--targets rss_downloader,cli,...]
+"""
+import argparse #cli args
+import json #child results
+import os #repo path
+import subprocess #fresh interpreters
+import sys #interpreter path
+import tempfile #base dirs
+import time #timing
+import statistics #medians
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ['requests', 'urllib3', 'feedparser', 'telegram', 'httpx', 'tkinter']
+
+# module -> expression constructing its downloader (None: import only)
+TARGETS = {'rss_downloader' : 'rss_downloader.RSSDownloader(base_dir)',
+           'async_downloader' : 'async_downloader.AsyncRSSDownloader(base_dir)',
+           'daemon' : None,
+           'cli' : None,
+           'downloader_gui' : None,
+           'telegram_bot' : None}
+
+CHILD = """
+import sys, time, json, importlib
+sys.path.insert(0, {repo!r})
+base_dir = {base_dir!r}
+start = time.perf_counter()
+module = importlib.import_module({module!r})
+imported = time.perf_counter()
+globals()[{module!r}] = module
+{construct}
+constructed = time.perf_counter()
+print(json.dumps({{'import_ms' : (imported - start) * 1000, 'construct_ms' : (constructed - imported) * 1000,
+                  'heavy' : [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def sample(module, construct):
+    with tempfile.TemporaryDirectory() as base_dir:
+        code = CHILD.format(repo=REPO_DIR, base_dir=base_dir, module=module, construct=construct or 'pass',
+                            heavy=HEAVY_MODULES)
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        return None
+
+    measured = json.loads(result.stdout.strip().splitlines()[-1])
+    measured['process_ms'] = elapsed * 1000
+    return measured
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="fresh processes per target, the median is reported")
+    parser.add_argument("--targets", default=",".join(TARGETS), help="comma separated entry modules")
+    args = parser.parse_args()
+
+    print(f"{'target':>18} {'process_ms':>11} {'import_ms':>10} {'construct_ms':>13}  heavy modules")
+    for module in args.targets.split(","):
+        samples = [sample(module, TARGETS.get(module)) for _ in range(args.repeat)]
+        if None in samples:
+            print(f"{module:>18} {'not importable here (missing dependency)':>37}")
+            continue
+
+        medians = {key : statistics.median(measured[key] for measured in samples)
+                   for key in ('process_ms', 'import_ms', 'construct_ms')}
+        print(f"{module:>18} {medians['process_ms']:>11.1f} {medians['import_ms']:>10.1f} "
+              f"{medians['construct_ms']:>13.1f}  {', '.join(samples[-1]['heavy']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Local stand-ins for the network services the downloader talks to,
+so benchmarks can run fully offline.
+
+StubServer serves RSS feeds (with ETag support) and .torrent bodies,
+and fakes the parts of the qBittorrent Web API and a JSON-RPC client
+the downloader uses.
+"""
+import json #json-rpc bodies
+import hashlib #fake infohashes
+import time #stalled feeds
+import threading #server thread
+import urllib.parse #form bodies
+import http.server #local http
+from xml.sax.saxutils import escape #feed xml
+
+WORDS = ["sousou", "no", "frieren", "kusuriya", "hitorigoto", "dungeon", "meshi",
+         "kaiju", "boku", "yakusoku", "shikanoko", "tensei", "slime", "oshi", "ko",
+         "spy", "family", "blue", "lock", "mushoku", "isekai", "girls", "band"]
+
+
+def make_watchlist(size, rng):
+    """ Synthetic watchlist of size unique show names """
+    watchlist = list()
+    while len(watchlist) < size:
+        name = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 4)))
+        watchlist.append(f"{name} {len(watchlist)}")
+    return watchlist
+
+
+def make_titles(watchlist, count, rng, hit_rate=0.1):
+    """ SubsPlease style release titles, hit_rate of them belonging to watchlist shows """
+    titles = list()
+    for i in range(count):
+        if watchlist and rng.random() < hit_rate:
+            show = rng.choice(watchlist).title()
+        else:
+            show = " ".join(rng.choice(WORDS) for _ in range(3)).title()
+        titles.append(f"[SubsPlease] {show} - {rng.randint(1, 24):02d} (1080p) [{i:08X}].mkv")
+    return titles
+
+
+def _info(name: str) -> bytes:
+    return b'd6:lengthi1e4:name' + str(len(name)).encode() + b':' + name.encode() + b'e'
+
+
+def make_torrent(name: str) -> bytes:
+    """ A tiny bencoded single file torrent """
+    return b'd4:info' + _info(name) + b'e'
+
+
+def make_feed(titles, base_url):
+    """ Render titles as a SubsPlease style RSS document, advertising the real infohash of every served torrent """
+    items = list()
+    for i, title in enumerate(titles):
+        name = hashlib.sha1(title.encode()).hexdigest()
+        infohash = hashlib.sha1(_info(f"{name}.torrent")).hexdigest()
+        items.append(f"<item><title>{escape(title)}</title>"
+                     f"<link>{base_url}/torrent/{name}.torrent</link>"
+                     f"<guid isPermaLink=\"false\">{name[:12].upper()}</guid>"
+                     f"<subsplease:infohash>{infohash}</subsplease:infohash></item>")
+
+    return ("<?xml version=\"1.0\" encoding=\"UTF-8\"?>"
+            "<rss version=\"2.0\" xmlns:subsplease=\"https://subsplease.org/rss\">"
+            f"<channel><title>stub</title>{''.join(items)}</channel></rss>").encode()
+
+
+class StubServer:
+
+    def __init__(self):
+        """
+        A threaded local HTTP server.
+
+        feeds maps a path such as '/rss/a' to an RSS body, served with an ETag.
+        delays maps a path to the seconds it stalls before answering.
+        '/torrent/<name>.torrent' returns a tiny bencoded torrent.
+        '/api/v2/...' fakes qBittorrent: app/version, auth/login and torrents/add,
+        recording every added url in added.
+        '/jsonrpc' answers JSON-RPC 2.0 (single or batch) calls, recording the
+        first uri of every call in added as well.
+        """
+        self.feeds = dict()
+        self.delays = dict()
+        self.added = list()
+        self.requests = 0
+        self.bytes_sent = 0
+        stub = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=b'', headers=None):
+                stub.requests += 1
+                stub.bytes_sent += len(body)
+                self.send_response(status)
+                for name, value in (headers or dict()).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                time.sleep(stub.delays.get(self.path, 0))
+                if self.path in stub.feeds:
+                    body = stub.feeds[self.path]
+                    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+                    if self.headers.get('If-None-Match') == etag:
+                        return self._send(304)
+                    return self._send(200, body, {'ETag' : etag, 'Content-Type' : 'application/rss+xml'})
+                if self.path.startswith('/torrent/'):
+                    return self._send(200, make_torrent(self.path.rsplit('/', 1)[1]))
+                if self.path == '/api/v2/app/version':
+                    return self._send(200, b'v4.6.0')
+                self._send(404)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(length).decode()
+                if self.path == '/jsonrpc':
+                    calls = json.loads(body)
+                    batch = isinstance(calls, list)
+                    results = list()
+                    for call in (calls if batch else [calls]):
+                        uris = [param for param in call.get('params', []) if isinstance(param, list)]
+                        stub.added.append(uris[0][0] if uris else '')
+                        results.append({'jsonrpc' : '2.0', 'id' : call.get('id'), 'result' : f"{len(stub.added):016x}"})
+                    return self._send(200, json.dumps(results if batch else results[0]).encode(),
+                                      {'Content-Type' : 'application/json'})
+                form = urllib.parse.parse_qs(body)
+                if self.path == '/api/v2/auth/login':
+                    return self._send(200, b'Ok.', {'Set-Cookie' : 'SID=stub; path=/'})
+                if self.path == '/api/v2/torrents/add':
+                    stub.added.extend(form.get('urls', [''])[0].split('\n'))
+                    return self._send(200, b'Ok.')
+                self._send(404)
+
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_port
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,165 @@
+import sys #exit code, streams
+import json #machine readable output
+import argparse #cli args
+
+import rss_downloader
+
+# exit codes
+EXIT_OK = 0
+EXIT_FAILED = 1  # a feed could not be fetched or a match could not be delivered
+EXIT_USAGE = 2  # bad arguments (argparse uses 2 as well) or an unreadable file
+EXIT_INTERRUPTED = 130
+
+
+def read_watchlist(path: str) -> dict:
+    """
+    Read items from a file ('-' for stdin): a JSON object of item: path pairs,
+    or text with one 'item' or 'item = path' per line, where blank lines and '#' comments are skipped.
+    """
+    if path == '-':
+        text = sys.stdin.read()
+    else:
+        with open(path, 'r', encoding='utf-8') as watchlist_file:
+            text = watchlist_file.read()
+
+    if path.lower().endswith('.json') or text.lstrip().startswith('{'):
+        return {str(item).strip().lower() : str(dir_path or '') for item, dir_path in json.loads(text).items()}
+
+    items = dict()
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        item, _, dir_path = line.partition('=')
+        items[item.strip().lower()] = dir_path.strip()
+
+    return items
+
+
+def write_watchlist(watchlist: dict, path: str) -> None:
+    """ Write items to a file ('-' for stdout), as JSON when path ends with .json and as 'item = path' lines otherwise """
+    if path.lower().endswith('.json'):
+        text = json.dumps(watchlist, indent=2) + "\n"
+    else:
+        text = "".join(f"{item} = {dir_path}\n" if dir_path else f"{item}\n" for item, dir_path in watchlist.items())
+
+    if path == '-':
+        sys.stdout.write(text)
+    else:
+        with open(path, 'w', encoding='utf-8') as watchlist_file:
+            watchlist_file.write(text)
+
+
+def run_command(downloader, args) -> int:
+    """ One download cycle, its report is printed as JSON """
+    downloader.download(dry_run=args.dry_run)
+    report = downloader.get_last_cycle()
+    counters = report['metrics']['counters']
+
+    output = {'dry_run' : report['dry_run'],
+              'matched' : len(report['matches']),
+              'delivered' : sum(match['delivered'] for match in report['matches']),
+              'feed_errors' : counters.get('feed_errors', 0) + counters.get('feed_timeouts', 0),
+              'failed_feeds' : counters.get('failed_feeds', 0),
+              'matches' : report['matches'],
+              'metrics' : report['metrics']}
+    json.dump(output, sys.stdout, indent=2 if args.pretty else None)
+    sys.stdout.write("\n")
+
+    return EXIT_FAILED if output['feed_errors'] or output['failed_feeds'] else EXIT_OK
+
+
+def housekeeping_command(downloader, args) -> int:
+    """ Removes obsolete episodes and stale torrent files, printing them as JSON """
+    report = downloader.housekeep(dry_run=args.dry_run)
+    json.dump({'dry_run' : args.dry_run,
+               'removed' : sum(entry['removed'] for entry in report),
+               'bytes_freed' : sum(entry['bytes'] for entry in report if entry['removed']),
+               'files' : report}, sys.stdout, indent=2 if args.pretty else None)
+    sys.stdout.write("\n")
+
+    return EXIT_FAILED if not args.dry_run and not all(entry['removed'] for entry in report) else EXIT_OK
+
+
+def feeds_command(downloader, args) -> int:
+    """ The health of every fetched feed as JSON, see RSSDownloader.get_feed_health() """
+    json.dump(downloader.get_feed_health(), sys.stdout, indent=2 if args.pretty else None)
+    sys.stdout.write("\n")
+    return EXIT_OK
+
+
+def watchlist_command(downloader, args) -> int:
+    if args.action == 'list':
+        watchlist = downloader.get_watchlist()
+        if args.json:
+            json.dump(watchlist, sys.stdout, indent=2)
+            sys.stdout.write("\n")
+        else:
+            write_watchlist(watchlist, '-')
+
+    elif args.action == 'export':
+        write_watchlist(downloader.get_watchlist(), args.file)
+
+    elif args.action == 'import':
+        try:
+            items = read_watchlist(args.file)
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"Could not read {args.file}: {e}", file=sys.stderr)
+            return EXIT_USAGE
+        count = downloader.add_items_to_watchlist(items, replace=args.replace)
+        print(f"Imported {count} items", file=sys.stderr)
+
+    elif args.action == 'remove':
+        missing = [item for item in args.items if not downloader.remove_item_from_watchlist(item)]
+        if missing:
+            print(f"Not in the watchlist: {', '.join(missing)}", file=sys.stderr)
+            return EXIT_FAILED
+
+    return EXIT_OK
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the RSS downloader once or edit its watchlist, for cron and scripts.")
+    parser.add_argument("--base-dir", help="directory holding config.ini and the state files")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="run one download cycle and print what matched as JSON")
+    run_parser.add_argument("--dry-run", action='store_true', help="match without delivering or remembering anything")
+    run_parser.add_argument("--pretty", action='store_true', help="indent the JSON output")
+
+    housekeeping_parser = commands.add_parser('housekeeping', help="remove obsolete episodes and stale torrent files")
+    housekeeping_parser.add_argument("--dry-run", action='store_true', help="only report what would be removed")
+    housekeeping_parser.add_argument("--pretty", action='store_true', help="indent the JSON output")
+
+    feeds_parser = commands.add_parser('feeds', help="print the failures, backoff and fetch latency of every feed as JSON")
+    feeds_parser.add_argument("--pretty", action='store_true', help="indent the JSON output")
+
+    watchlist_parser = commands.add_parser('watchlist', help="list, import, export or remove watchlist items")
+    actions = watchlist_parser.add_subparsers(dest='action', required=True)
+    list_parser = actions.add_parser('list', help="print the watchlist")
+    list_parser.add_argument("--json", action='store_true', help="print a JSON object instead of 'item = path' lines")
+    export_parser = actions.add_parser('export', help="write the watchlist to a .json or text file")
+    export_parser.add_argument("file", nargs='?', default='-', help="target file, '-' for stdout")
+    import_parser = actions.add_parser('import', help="add the items of a .json or text file with one config write")
+    import_parser.add_argument("file", help="source file, '-' for stdin")
+    import_parser.add_argument("--replace", action='store_true', help="remove the items missing from the file")
+    remove_parser = actions.add_parser('remove', help="remove items from the watchlist")
+    remove_parser.add_argument("items", nargs='+')
+
+    args = parser.parse_args(argv)
+
+    try:
+        downloader = rss_downloader.RSSDownloader(args.base_dir)
+        if args.command == 'run':
+            return run_command(downloader, args)
+        if args.command == 'housekeeping':
+            return housekeeping_command(downloader, args)
+        if args.command == 'feeds':
+            return feeds_command(downloader, args)
+        return watchlist_command(downloader, args)
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+import os #stat, fsync, atomic replace
+import sys #platform
+import threading #lock
+import configparser #configparser
+from contextlib import contextmanager #batch()
+
+if sys.platform == 'win32':
+    import msvcrt #file locking
+else:
+    import fcntl #file locking
+
+_UNSET = object()
+
+
+class ConfigStore:
+
+    def __init__(self, path: str):
+        """
+        A cached, write-coalescing wrapper around config.ini.
+
+        Reads go through typed accessors whose parsed values are cached until
+        the file changes. Changes are applied in memory at once and written
+        to disk atomically (temp file, fsync, rename) while holding a lock
+        file, so the GUI and the Telegram bot processes never overwrite
+        each other: the file is re-read under the lock and the changes
+        are replayed on top of it. Inside a batch() block all changes
+        are coalesced into a single write.
+
+        Methods
+        -------
+        get(section, option, fallback) / getboolean / getint / getfloat
+            Typed, cached reads
+
+        items(section)
+            Get the (option, value) pairs of a section
+
+        set(section, option, value)
+            Changes an option, creating its section if needed
+
+        remove_option(section, option)
+            Removes an option, returns False if it did not exist
+
+        batch()
+            Context manager writing all changes made inside it at once
+
+        reload_if_changed()
+            Re-reads the file if another process changed it
+        """
+        self._path = path
+        self._lock = threading.RLock()
+        self._cache = dict()
+        self._pending = list()
+        self._batch_depth = 0
+        self._parser, self._stamp = self._read()
+
+    def reload_if_changed(self) -> bool:
+        """ Re-reads the file when its mtime or size changed, returns True if it did """
+        with self._lock:
+            if self._file_stamp() == self._stamp:
+                return False
+
+            self._parser, self._stamp = self._read()
+            self._cache.clear()
+            return True
+
+    def has_section(self, section: str) -> bool:
+        with self._lock:
+            return self._parser.has_section(section)
+
+    def items(self, section: str) -> list:
+        with self._lock:
+            key = ('items', section)
+            if key not in self._cache:
+                self._cache[key] = self._parser.items(section) if self._parser.has_section(section) else list()
+            return list(self._cache[key])
+
+    def get(self, section: str, option: str, fallback=_UNSET) -> str:
+        return self._typed(self._parser.get, section, option, fallback)
+
+    def getboolean(self, section: str, option: str, fallback=_UNSET) -> bool:
+        return self._typed(self._parser.getboolean, section, option, fallback)
+
+    def getint(self, section: str, option: str, fallback=_UNSET) -> int:
+        return self._typed(self._parser.getint, section, option, fallback)
+
+    def getfloat(self, section: str, option: str, fallback=_UNSET) -> float:
+        return self._typed(self._parser.getfloat, section, option, fallback)
+
+    def set(self, section: str, option: str, value: str) -> None:
+        """ Changes an option, written at once or at the end of the current batch """
+        with self.batch():
+            self._apply(('set', section, option, value))
+
+    def remove_option(self, section: str, option: str) -> bool:
+        """ Removes an option, returns False if it did not exist """
+        with self.batch():
+            if not self._parser.has_option(section, option):
+                return False
+            self._apply(('remove', section, option))
+            return True
+
+    @contextmanager
+    def batch(self):
+        """ All changes made inside the block are written with a single atomic write """
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if self._batch_depth == 0 and self._pending:
+                    self._commit()
+
+    def _typed(self, getter, section, option, fallback):
+        with self._lock:
+            key = (getter.__name__, section, option)
+            if key not in self._cache:
+                try:
+                    self._cache[key] = getter(section, option)
+                except (configparser.NoSectionError, configparser.NoOptionError):
+                    if fallback is _UNSET:
+                        raise
+                    return fallback
+            return self._cache[key]
+
+    def _apply(self, change, parser=None):
+        parser = self._parser if parser is None else parser
+        if change[0] == 'set':
+            _, section, option, value = change
+            if not parser.has_section(section):
+                parser.add_section(section)
+            parser.set(section, option, value)
+        else:
+            _, section, option = change
+            if parser.has_section(section):
+                parser.remove_option(section, option)
+
+        if parser is self._parser:
+            self._pending.append(change)
+            self._cache.clear()
+
+    def _commit(self):
+        with self._file_lock():
+            # another process wrote in the meantime, replay our changes on top of its version
+            if self._file_stamp() != self._stamp:
+                parser, _ = self._read()
+                for change in self._pending:
+                    self._apply(change, parser)
+                self._parser = parser
+                self._cache.clear()
+
+            tmp_path = f"{self._path}.tmp"
+            with open(tmp_path, 'w') as configfile:
+                self._parser.write(configfile)
+                configfile.flush()
+                os.fsync(configfile.fileno())
+            os.replace(tmp_path, self._path)
+
+            self._stamp = self._file_stamp()
+            self._pending.clear()
+
+    def _read(self):
+        parser = configparser.ConfigParser()
+        stamp = self._file_stamp()
+        parser.read(self._path)
+        return parser, stamp
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self._path)
+        except OSError:
+            return None
+
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _file_lock(self):
+        return file_lock(f"{self._path}.lock")
+
+
+@contextmanager
+def file_lock(path: str):
+    """ Cross process lock on the sidecar file at path, held for the block """
+    with open(path, 'a+') as lock_file:
+        if sys.platform == 'win32':
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if sys.platform == 'win32':
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
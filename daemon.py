@@ -0,0 +1,121 @@
+import sys #exit code
+import time #clock
+import random #jitter
+import signal #graceful shutdown
+import logging #logging
+import argparse #cli args
+import datetime #weekly slots
+import threading #stop event
+
+import rss_downloader
+from metrics import PrometheusSink
+
+WEEK_MINUTES = 7 * 24 * 60
+
+
+class AdaptiveScheduler:
+
+    def __init__(self, base_interval: float = 900, fast_interval: float = 60,
+                 window: float = 45, jitter: float = 0.2):
+        """
+        Decide how long to wait before the next download cycle.
+
+        Past matches are turned into weekly release slots (minute of the week).
+        Around a slot, from window minutes before it to window minutes after it,
+        the feed is polled every fast_interval seconds. Otherwise it is polled
+        every base_interval seconds, scaled by a random +-jitter fraction, but
+        never past the start of the next window.
+
+        Methods
+        -------
+        learn(match_history)
+            Rebuild the release slots from (item, timestamp) pairs
+
+        next_delay(now)
+            Seconds to sleep before the next cycle
+        """
+        self._base_interval = base_interval
+        self._fast_interval = fast_interval
+        self._window = window
+        self._jitter = jitter
+        self._slots = list()
+
+    def learn(self, match_history) -> None:
+        """ Rebuild the weekly release slots from (item, timestamp) pairs """
+        slots = set()
+        for item, timestamp in match_history:
+            when = datetime.datetime.fromtimestamp(timestamp)
+            slots.add(when.weekday() * 24 * 60 + when.hour * 60 + when.minute)
+
+        self._slots = sorted(slots)
+
+    def next_delay(self, now: float = None) -> float:
+        """ Seconds to sleep before the next cycle """
+        when = datetime.datetime.fromtimestamp(time.time() if now is None else now)
+        minute = when.weekday() * 24 * 60 + when.hour * 60 + when.minute + when.second / 60
+
+        until_window = None
+        for slot in self._slots:
+            # minutes from now until the slot, wrapping around the week
+            offset = (slot - minute + WEEK_MINUTES / 2) % WEEK_MINUTES - WEEK_MINUTES / 2
+            if abs(offset) <= self._window:
+                return self._fast_interval
+            ahead = (offset - self._window) % WEEK_MINUTES
+            until_window = ahead if until_window is None else min(until_window, ahead)
+
+        delay = self._base_interval * random.uniform(1 - self._jitter, 1 + self._jitter)
+        if until_window is not None:
+            delay = min(delay, until_window * 60)
+
+        return max(delay, self._fast_interval)
+
+
+def run(scheduler: AdaptiveScheduler, stop: threading.Event, metrics_port: int = None) -> None:
+    """ Runs download cycles until stop is set, serving Prometheus metrics on metrics_port if given """
+    logger = logging.getLogger()
+    downloader = rss_downloader.RSSDownloader()
+
+    if metrics_port:
+        sink = PrometheusSink()
+        downloader.add_metrics_sink(sink)
+        sink.serve(metrics_port)
+        logger.info(f"Serving metrics on port {metrics_port}")
+
+    while not stop.is_set():
+        try:
+            downloaded_items = downloader.download()
+        except Exception:
+            logger.exception("Download cycle failed")
+            downloaded_items = list()
+
+        for title in downloaded_items:
+            logger.info(f"Daemon downloaded {title}")
+
+        scheduler.learn(downloader.get_match_history())
+        delay = scheduler.next_delay()
+        logger.info(f"Next download cycle in {delay:.0f} seconds")
+        stop.wait(delay)
+
+    logger.info("Daemon stopped")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Poll the RSS feeds on an adaptive schedule, without a GUI.")
+    parser.add_argument("--interval", type=float, default=900, help="seconds between cycles outside release windows")
+    parser.add_argument("--fast-interval", type=float, default=60, help="seconds between cycles inside release windows")
+    parser.add_argument("--window", type=float, default=45, help="minutes around a learned release time to poll fast")
+    parser.add_argument("--jitter", type=float, default=0.2, help="random fraction added to the slow interval")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this port at /metrics")
+    args = parser.parse_args(argv)
+
+    stop = threading.Event()
+    # a cycle in progress finishes before the daemon exits
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+
+    run(AdaptiveScheduler(args.interval, args.fast_interval, args.window, args.jitter), stop, args.metrics_port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
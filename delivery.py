@@ -0,0 +1,227 @@
+import os #folders, atomic replace
+import json #rpc bodies
+import shutil #copies of fetched torrents
+import logging #logging
+from collections import namedtuple #deliveries
+import requests #rpc session
+from torrent_cache import infohash_from_torrent #payload identity
+
+# one matched entry headed for one watchlist item, infohash is '' when the feed does not expose it
+Delivery = namedtuple('Delivery', ['title', 'link', 'item', 'dir_path', 'infohash'], defaults=[''])
+
+
+class DeliveryBackend:
+    """
+    Hands the matches of a cycle to a torrent client.
+
+    deliver() receives every Delivery of the cycle at once, so backends can batch,
+    and returns the set of links that could not be delivered. name is used in
+    the logs, stage names the metrics stage the delivery time is added to.
+    infohashes maps the links of the last deliver() call to the infohash of
+    their payload, for backends that learn it while delivering.
+    """
+    name = 'a torrent client'
+    stage = 'deliver'
+    # never changed here, backends that learn infohashes assign their own dict
+    infohashes = dict()
+
+    def deliver(self, deliveries) -> set:
+        raise NotImplementedError
+
+
+class WatchFolderBackend(DeliveryBackend):
+    name = 'the watch folder'
+    stage = 'torrent_fetch'
+
+    def __init__(self, fetcher, folder: str, per_show: bool = False, cache=None, seen=None):
+        """
+        Writes .torrent files (and .magnet files for magnet links) into a folder
+        that a torrent client watches and auto-loads.
+
+        With per_show every item gets its own sub folder named after it.
+        .torrent files are fetched in parallel by fetcher (a TorrentFetcher),
+        all files are written to a temp name and renamed into place.
+        With cache (a TorrentCache) torrents whose infohash is known are copied
+        from it, and every payload of a batch is fetched only once.
+        The infohash of every fetched torrent is read from its body, with seen
+        (a SeenStore) a payload delivered before under another title or GUID
+        is dropped instead of written.
+        """
+        self._fetcher = fetcher
+        self._folder = folder
+        self._per_show = per_show
+        self._cache = cache
+        self._seen = seen
+        self._logger = logging.getLogger()
+        self.infohashes = dict()
+
+    def deliver(self, deliveries) -> set:
+        failed = set()
+        torrents = dict()
+        self.infohashes = dict()
+        for delivery in deliveries:
+            folder = f"{self._folder}{delivery.item.title()}/" if self._per_show else self._folder
+            try:
+                os.makedirs(folder, exist_ok=True)
+            except OSError as e:
+                self._logger.error(f"Could not create {folder}: {e}")
+                failed.add(delivery.link)
+                continue
+
+            if delivery.link.startswith('magnet:'):
+                if not self._write_magnet(f"{folder}{delivery.title}.magnet", delivery.link):
+                    failed.add(delivery.link)
+            else:
+                torrents[f"{folder}{delivery.title}.torrent"] = delivery
+
+        # the cache serves known payloads, the rest is fetched once per infohash and copied to the other paths
+        fetches = dict()
+        copies = dict()
+        fetched_by_hash = dict()
+        for dest_path, delivery in torrents.items():
+            try:
+                if self._cache is not None and delivery.infohash and self._cache.copy_to(delivery.infohash, dest_path):
+                    continue
+            except OSError as e:
+                self._logger.error(f"Could not write {dest_path}: {e}")
+                failed.add(delivery.link)
+                continue
+            if delivery.infohash in fetched_by_hash:
+                copies[dest_path] = fetched_by_hash[delivery.infohash]
+                continue
+            if delivery.infohash:
+                fetched_by_hash[delivery.infohash] = dest_path
+            fetches[dest_path] = delivery
+
+        # fetched torrents land next to their destination and are only renamed into place once their payload is known
+        fetched = self._fetcher.fetch_all((delivery.link, f"{dest_path}.fetched") for dest_path, delivery in fetches.items())
+        results = dict()
+        for dest_path, delivery in fetches.items():
+            error = fetched[f"{dest_path}.fetched"]
+            if error is None:
+                error = self._place(f"{dest_path}.fetched", dest_path, delivery)
+            results[dest_path] = error
+            if error is not None:
+                self._logger.error(f"Could not download {delivery.title}: {error}")
+                failed.add(delivery.link)
+
+        for dest_path, source_path in copies.items():
+            if results[source_path] is not None:
+                failed.add(torrents[dest_path].link)
+                continue
+            try:
+                shutil.copyfile(source_path, f"{dest_path}.part")
+                os.replace(f"{dest_path}.part", dest_path)
+            except OSError as e:
+                self._logger.error(f"Could not copy {torrents[dest_path].title}: {e}")
+                failed.add(torrents[dest_path].link)
+
+        return failed
+
+    def _place(self, fetched_path, dest_path, delivery):
+        """ Renames a fetched torrent to dest_path unless its payload was delivered before, returns the error or None """
+        try:
+            if self._cache is not None:
+                infohash = self._cache.add_file(fetched_path)
+            else:
+                with open(fetched_path, 'rb') as torrent_file:
+                    infohash = infohash_from_torrent(torrent_file.read())
+            # the same payload under another link, in an earlier cycle or earlier in this batch
+            duplicate = infohash and ((self._seen is not None and infohash in self._seen) or
+                                      any(link != delivery.link and known == infohash
+                                          for link, known in self.infohashes.items()))
+            if infohash:
+                self.infohashes[delivery.link] = infohash
+            if duplicate:
+                os.remove(fetched_path)
+                self._logger.info(f"Skipped {delivery.title}, its torrent was delivered before")
+                return None
+            os.replace(fetched_path, dest_path)
+        except OSError as e:
+            return e
+
+        return None
+
+    def _write_magnet(self, dest_path, link):
+        tmp_path = f"{dest_path}.part"
+        try:
+            with open(tmp_path, 'w') as magnet_file:
+                magnet_file.write(link)
+            os.replace(tmp_path, dest_path)
+        except OSError as e:
+            self._logger.error(f"Could not write {dest_path}: {e}")
+            return False
+
+        return True
+
+
+class QBitWebBackend(DeliveryBackend):
+    name = 'qBittorrent'
+    stage = 'qbit_submit'
+
+    def __init__(self, qbit):
+        """ Adds links through the qBittorrent Web API (a QBitManager), one request per save directory """
+        self._qbit = qbit
+
+    def deliver(self, deliveries) -> set:
+        by_dir = dict()
+        for delivery in deliveries:
+            by_dir.setdefault(delivery.dir_path, list()).append(delivery.link)
+
+        failed = set()
+        for dir_path, links in by_dir.items():
+            if not self._qbit.add_links(links, savepath=dir_path):
+                failed.update(links)
+
+        return failed
+
+
+class JsonRpcBackend(DeliveryBackend):
+    name = 'the JSON-RPC client'
+    stage = 'rpc_submit'
+
+    def __init__(self, url: str, method: str = 'aria2.addUri', token: str = '', timeout: float = 10.0):
+        """
+        Adds links through a JSON-RPC 2.0 Web API, all of a cycle in one batch request.
+
+        Every link becomes a call of method with params [token:<token>, [link], {"dir": dir_path}],
+        the shape aria2 uses, the token is left out when empty.
+        """
+        self._url = url
+        self._method = method
+        self._token = token
+        self._timeout = timeout
+        self._logger = logging.getLogger()
+        self._session = requests.Session()
+
+    def deliver(self, deliveries) -> set:
+        deliveries = list(deliveries)
+        if not deliveries:
+            return set()
+
+        calls = list()
+        for call_id, delivery in enumerate(deliveries):
+            params = [[delivery.link], {'dir' : delivery.dir_path}]
+            if self._token:
+                params.insert(0, f"token:{self._token}")
+            calls.append({'jsonrpc' : '2.0', 'id' : call_id, 'method' : self._method, 'params' : params})
+
+        try:
+            response = self._session.post(self._url, data=json.dumps(calls), timeout=self._timeout,
+                                          headers={'Content-Type' : 'application/json'})
+            response.raise_for_status()
+            results = response.json()
+        except (requests.RequestException, ValueError) as e:
+            self._logger.error(f"JSON-RPC delivery to {self._url} failed: {e}")
+            return set(delivery.link for delivery in deliveries)
+
+        if isinstance(results, dict):
+            results = [results]
+        succeeded = set(result.get('id') for result in results if 'error' not in result)
+        failed = set()
+        for call_id, delivery in enumerate(deliveries):
+            if call_id not in succeeded:
+                self._logger.error(f"JSON-RPC could not add {delivery.title}")
+                failed.add(delivery.link)
+
+        return failed
@@ -2,8 +2,11 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from rss_downloader import RSSDownloader
 import webbrowser
-from multiprocessing import Process
-import telegram_bot
+import threading
+import queue
+import time
+
+FIRST_CYCLE_DELAY_MS = 200
 
 class RSSDownloaderGUI:
     def __init__(self):
@@ -12,6 +15,11 @@ class RSSDownloaderGUI:
 
         self.downloader = RSSDownloader()
 
+        # download cycles run on a worker thread and report back through this queue
+        self.download_results = queue.Queue()
+        self.download_worker = None
+        self.cancel_download_event = threading.Event()
+
         self.tabs = ttk.Notebook(self.root)
         self.main_tab = ttk.Frame(self.tabs)
         self.settings_tab = ttk.Frame(self.tabs)
@@ -22,8 +30,12 @@ class RSSDownloaderGUI:
         self.populate_main_tab()
 
         self.populate_settings_tab()
-        self.manual_download()
+        # the window is drawn before the first cycle starts
+        self.root.after(FIRST_CYCLE_DELAY_MS, self.manual_download)
         """ if self.downloader.get_telegram_integration_status():
+            # the bot pulls in python-telegram-bot and httpx, only load it when it runs
+            from multiprocessing import Process
+            import telegram_bot
             self.proc = Process(target=telegram_bot.bot, daemon=True)
             self.proc.start() """
         self.root.mainloop()
@@ -37,25 +49,50 @@ class RSSDownloaderGUI:
         download_label.grid(row=0, column=0, columnspan=3, pady=10)
 
         # Download Button
-        download_button = ttk.Button(main_frame, text="Download", command=self.manual_download, style="Download.TButton")
-        download_button.grid(row=1, column=0, columnspan=3, pady=10)
+        self.download_button = ttk.Button(main_frame, text="Download", command=self.manual_download, style="Download.TButton")
+        self.download_button.grid(row=1, column=0, columnspan=3, pady=10)
+
+        # Download progress and Cancel Button
+        self.download_progress = ttk.Progressbar(main_frame, mode='indeterminate', length=300)
+        self.download_progress.grid(row=2, column=0, columnspan=2, pady=5)
+        self.cancel_button = ttk.Button(main_frame, text="Cancel", command=self.cancel_download, state='disabled')
+        self.cancel_button.grid(row=2, column=2, pady=5)
 
         # Separator Line
         separator = ttk.Separator(main_frame, orient="horizontal")
-        separator.grid(row=2, column=0, columnspan=3, sticky="NSEW", pady=10)
+        separator.grid(row=3, column=0, columnspan=3, sticky="NSEW", pady=10)
 
-        # Watchlist Label
+        # Watchlist Label and filter-as-you-type Search
         watchlist_label = ttk.Label(main_frame, text='Watchlist:')
-        watchlist_label.grid(row=3, column=0, columnspan=3, pady=10)
-
-        # Watchlist Treeview (2D Listbox) with Vertical Scrollbar
-        columns = ("Item", "Directory Path")
+        watchlist_label.grid(row=4, column=0, pady=10)
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add('write', lambda *args: self.filter_watchlist())
+        search_entry = ttk.Entry(main_frame, textvariable=self.search_var, width=40)
+        search_entry.grid(row=4, column=1, columnspan=2, pady=10)
+
+        # Watchlist Treeview (2D Listbox) with Vertical Scrollbar, one row per item with the item as its id
+        columns = ("Item", "Directory Path", "Progress", "Last Episode", "Last Match")
         self.watchlist_tree = ttk.Treeview(main_frame, columns=columns, show="headings", selectmode='browse')
 
         self.watchlist_tree.heading("Item", text="Item")
         self.watchlist_tree.heading("Directory Path", text="Directory Path")
+        self.watchlist_tree.heading("Progress", text="Episodes")
+        self.watchlist_tree.heading("Last Episode", text="Last Episode")
+        self.watchlist_tree.heading("Last Match", text="Last Match")
         self.watchlist_tree.column("Item", width=200, anchor='center')
         self.watchlist_tree.column("Directory Path", width=300, anchor='center')
+        self.watchlist_tree.column("Progress", width=150, anchor='center')
+        self.watchlist_tree.column("Last Episode", width=100, anchor='center')
+        self.watchlist_tree.column("Last Match", width=130, anchor='center')
+
+        # item -> row values, item -> lowercase text the search looks in, items currently shown
+        self.watchlist_rows = dict()
+        self.search_index = dict()
+        self.visible_items = set()
+        # the last search and the items it found, a longer search only narrows them
+        self.last_search = ('', None)
+        # item -> (last matched episode, match time), updated from the report of every cycle
+        self.item_status = dict()
 
         # Double-click event binding for the Watchlist Treeview
         self.watchlist_tree.bind("<Double-1>", self.double_click_watchlist_item)
@@ -63,51 +100,157 @@ class RSSDownloaderGUI:
 
         # Adding Vertical Scrollbar
         tree_scroll_y = ttk.Scrollbar(main_frame, orient="vertical", command=self.watchlist_tree.yview)
-        tree_scroll_y.grid(row=4, column=3, sticky="NS")
+        tree_scroll_y.grid(row=5, column=3, sticky="NS")
 
         self.watchlist_tree.configure(yscrollcommand=tree_scroll_y.set)
 
-        self.watchlist_tree.grid(row=4, column=0, columnspan=3, pady=10)
+        self.watchlist_tree.grid(row=5, column=0, columnspan=3, pady=10)
 
         # Remove Button
         remove_button = ttk.Button(main_frame, text="Remove Item", command=self.remove_watchlist_item)
-        remove_button.grid(row=5, column=0, pady=10)
+        remove_button.grid(row=6, column=0, pady=10)
 
         # Add Button
         add_button = ttk.Button(main_frame, text="Add Item", command=self.add_watchlist_item)
-        add_button.grid(row=5, column=1, pady=10)
+        add_button.grid(row=6, column=1, pady=10)
 
         # Select Directory Button
         select_directory_button = ttk.Button(main_frame, text="Change Item Directory", command=self.select_directory)
-        select_directory_button.grid(row=5, column=2, pady=10)
+        select_directory_button.grid(row=6, column=2, pady=10)
 
         # Refresh Button
-        refresh_button = ttk.Button(main_frame, text="Refresh Watchlist", command=self.refresh_watchlist)
-        refresh_button.grid(row=6, column=0, columnspan=3, pady=10)
+        refresh_button = ttk.Button(main_frame, text="Refresh Watchlist", command=lambda: self.refresh_watchlist(reload_status=True))
+        refresh_button.grid(row=7, column=0, columnspan=3, pady=10)
 
         # External Link Button
         link_button = ttk.Button(main_frame, text="Visit AniChart", command=self.open_anichart)
-        link_button.grid(row=7, column=0, columnspan=3, pady=10)
+        link_button.grid(row=8, column=0, columnspan=3, pady=10)
 
         self.root.style = ttk.Style()
         self.root.style.configure("Download.TButton", padding=(10, 5), borderwidth=2, relief="solid")
 
         # Refresh Watchlist initially
-        self.refresh_watchlist()
+        self.refresh_watchlist(reload_status=True)
 
     def manual_download(self):
-        downloaded_items = self.downloader.download()
-        if downloaded_items:
-            message = "Manual download successful. Downloaded items:\n" + "\n".join(downloaded_items)
+        # only one download cycle at a time
+        if self.download_worker is not None and self.download_worker.is_alive():
+            return
+
+        self.cancel_download_event.clear()
+        self.download_button.configure(state='disabled')
+        self.cancel_button.configure(state='normal')
+        self.download_progress.start(10)
+
+        self.download_worker = threading.Thread(target=self._download_cycle, daemon=True)
+        self.download_worker.start()
+        self.root.after(100, self._poll_download_results)
+
+    def cancel_download(self):
+        self.cancel_download_event.set()
+        self.cancel_button.configure(state='disabled')
+
+    def _download_cycle(self):
+        """ Runs on the worker thread, never touches Tk """
+        try:
+            downloaded_items = self.downloader.download(cancel_event=self.cancel_download_event)
+            self.download_results.put(('done', downloaded_items))
+        except Exception as e:
+            self.download_results.put(('error', e))
+
+    def _poll_download_results(self):
+        try:
+            status, result = self.download_results.get_nowait()
+        except queue.Empty:
+            self.root.after(100, self._poll_download_results)
+            return
+
+        self.download_progress.stop()
+        self.download_button.configure(state='normal')
+        self.cancel_button.configure(state='disabled')
+        if status == 'done':
+            self.apply_cycle_report()
+
+        if status == 'error':
+            messagebox.showerror("Manual Download", f"Download failed: {result}")
+        elif result:
+            message = "Manual download successful. Downloaded items:\n" + "\n".join(result)
             messagebox.showinfo("Manual Download", message)
+        elif self.cancel_download_event.is_set():
+            messagebox.showinfo("Manual Download", "Download cancelled.")
         else:
             messagebox.showinfo("Manual Download", "No new items found.")
 
-    def refresh_watchlist(self):
-        self.watchlist_tree.delete(*self.watchlist_tree.get_children())
+    def refresh_watchlist(self, reload_status=False):
+        """ Brings the rows in line with the watchlist, only added, removed and changed items are touched """
+        if reload_status:
+            self.item_status = self.downloader.get_item_status()
+
         watchlist = self.downloader.get_watchlist()
+        for item in [item for item in self.watchlist_rows if item not in watchlist]:
+            self.remove_row(item)
         for item, dir_path in watchlist.items():
-            self.watchlist_tree.insert("", "end", values=(item.title(), dir_path))
+            self.set_row(item, dir_path)
+
+    def apply_cycle_report(self):
+        """ Updates the rows of the items the last cycle delivered something for """
+        report = self.downloader.get_last_cycle()
+        if report is None:
+            return
+
+        for match in report['matches']:
+            item = match['item']
+            if match['delivered'] and item in self.watchlist_rows:
+                self.item_status[item] = (match['episode'] or match['title'], time.time())
+                self.set_row(item, self.watchlist_rows[item][1])
+
+    def row_values(self, item, dir_path):
+        episode, matched_at = self.item_status.get(item, ('', None))
+        last_match = time.strftime('%Y-%m-%d %H:%M', time.localtime(matched_at)) if matched_at else ''
+        return (item.title(), dir_path, self.downloader.get_progress_text(item), episode, last_match)
+
+    def set_row(self, item, dir_path):
+        """ Adds the row of item or updates it when its values changed """
+        values = self.row_values(item, dir_path)
+        if item not in self.watchlist_rows:
+            self.watchlist_tree.insert("", "end", iid=item, values=values)
+            self.visible_items.add(item)
+        elif self.watchlist_rows[item] == values:
+            return
+        else:
+            self.watchlist_tree.item(item, values=values)
+
+        self.watchlist_rows[item] = values
+        self.search_index[item] = f"{item} {dir_path}".lower()
+        self.last_search = ('', None)
+        if self.search_var.get():
+            self.filter_watchlist()
+
+    def remove_row(self, item):
+        self.watchlist_tree.delete(item)
+        del self.watchlist_rows[item]
+        del self.search_index[item]
+        self.visible_items.discard(item)
+        self.last_search = ('', None)
+
+    def filter_watchlist(self):
+        """ Shows the rows containing the search text, detaching and reattaching only the rows that changed """
+        search = self.search_var.get().strip().lower()
+        last_search, last_found = self.last_search
+        candidates = last_found if last_found is not None and search.startswith(last_search) else self.search_index
+        found = set(item for item in candidates if search in self.search_index[item])
+        self.last_search = (search, found)
+
+        position = 0
+        for item in self.watchlist_rows:
+            if item in found:
+                if item not in self.visible_items:
+                    self.watchlist_tree.move(item, "", position)
+                    self.visible_items.add(item)
+                position += 1
+            elif item in self.visible_items:
+                self.watchlist_tree.detach(item)
+                self.visible_items.discard(item)
 
     def open_anichart(self):
         webbrowser.open("https://anichart.net")
@@ -122,16 +265,16 @@ class RSSDownloaderGUI:
         if not selected_item:
             return
 
-        item = self.watchlist_tree.item(selected_item, 'values')[0]
-        confirmed = messagebox.askyesno("Remove Item", f"Are you sure you want to remove '{item}' from the watchlist?")
+        item = selected_item[0]
+        confirmed = messagebox.askyesno("Remove Item", f"Are you sure you want to remove '{item.title()}' from the watchlist?")
         
         if confirmed:
-            success = self.downloader.remove_item_from_watchlist(item.lower())
+            success = self.downloader.remove_item_from_watchlist(item)
             if success:
-                self.refresh_watchlist()
-                messagebox.showinfo("Watchlist", f"Item '{item}' removed from watchlist.")
+                self.remove_row(item)
+                messagebox.showinfo("Watchlist", f"Item '{item.title()}' removed from watchlist.")
             else:
-                messagebox.showwarning("Watchlist", f"Item '{item}' not found in the watchlist.")
+                messagebox.showwarning("Watchlist", f"Item '{item.title()}' not found in the watchlist.")
 
     def add_watchlist_item(self):
         dialog = AddItemDialog(self.root)
@@ -139,7 +282,8 @@ class RSSDownloaderGUI:
         if dialog.result:
             item_name, dir_path = dialog.result
             self.downloader.add_item_to_watchlist(item_name, dir_path)
-            self.refresh_watchlist()
+            # config.ini keys are lowercase
+            self.set_row(item_name.lower(), dir_path)
             messagebox.showinfo("Watchlist", f"Item '{item_name}' added to the watchlist with file path '{dir_path}'.")
 
 
@@ -148,12 +292,12 @@ class RSSDownloaderGUI:
         if not selected_item:
             return
 
-        item = self.watchlist_tree.item(selected_item, 'values')[0]
+        item = selected_item[0]
         dir_path = filedialog.askdirectory()
         if dir_path:
             self.downloader.add_item_to_watchlist(item, f"{dir_path}/")
-            self.refresh_watchlist()
-            messagebox.showinfo("Watchlist", f"Directory path for item '{item}' updated.")
+            self.set_row(item, f"{dir_path}/")
+            messagebox.showinfo("Watchlist", f"Directory path for item '{item.title()}' updated.")
 
     def populate_settings_tab(self):
         settings_frame = ttk.Frame(self.settings_tab, padding=(10, 10, 10, 10))
@@ -197,8 +341,13 @@ class RSSDownloaderGUI:
                 browse_button = ttk.Button(settings_frame, text="Browse", command=lambda s=setting, e=entry: self.browse_file(s, e))
                 browse_button.grid(row=i, column=2, pady=5)
                 self.settings_var[setting] = entry
-            elif "download_dir" in setting.lower():
-                # For "download_dir", add Entry and Browse button to choose a directory
+            elif setting.lower() == 'delivery_backend':
+                choice_var = tk.StringVar(value=value.lower())
+                choice_combobox = ttk.Combobox(settings_frame, values=['auto', 'watch_folder', 'qbit', 'jsonrpc'], textvariable=choice_var, state='readonly')
+                choice_combobox.grid(row=i, column=1, pady=5)
+                self.settings_var[setting] = choice_var
+            elif setting.lower() in ('download_dir', 'watch_dir'):
+                # For "download_dir" and "watch_dir", add Entry and Browse button to choose a directory
                 entry = ttk.Entry(settings_frame, width=40)
                 entry.insert(0, value)
                 entry.grid(row=i, column=1, pady=5)
@@ -217,13 +366,16 @@ class RSSDownloaderGUI:
         save_button.grid(row=len(settings) + 1, column=0, columnspan=3, pady=10)
 
     def save_settings(self):
+        settings = dict()
         for setting, var in self.settings_var.items():
             if isinstance(var, tk.StringVar):
                 # For binary choices, convert Yes/No to lowercase before saving
-                self.downloader.change_setting(setting, var.get().lower())
+                settings[setting] = var.get().lower()
             else:
                 # For other settings, save the entry value
-                self.downloader.change_setting(setting, var.get())
+                settings[setting] = var.get()
+        # a single write of config.ini for the whole tab
+        self.downloader.change_settings(settings)
         messagebox.showinfo("Settings", "Settings saved.")
         self.populate_settings_tab()
 
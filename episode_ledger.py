@@ -0,0 +1,93 @@
+import sqlite3 #persistence
+import threading #lock
+
+
+class EpisodeLedger:
+
+    def __init__(self, path: str):
+        """
+        Remembers which episodes were already grabbed for every watchlist item,
+        so other groups, resolutions and older versions of the same episode
+        are dropped with a dict lookup.
+
+        Episodes are kept in an episodes table of the SQLite database at path, shared by
+        every process using it, and mirrored per item and season as {episode: version}.
+        The mirror is reloaded when another process recorded grabs.
+
+        Methods
+        -------
+        has(item, season, episode, version)
+            Check whether this episode (in this or a newer version) was grabbed
+
+        record(grabs)
+            Remembers (item, season, episode, version) tuples
+
+        progress(item)
+            Get {season: sorted episodes} for item
+
+        format_progress(item)
+            Get the grabbed episodes of item as compact ranges, e.g. 'S1: 1-5, 7'
+        """
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS episodes "
+                         "(item TEXT, season INTEGER, episode REAL, version INTEGER, PRIMARY KEY (item, season, episode))")
+        self._db.commit()
+        self._data_version = None
+        self._episodes = dict()
+
+    def has(self, item: str, season: int, episode: float, version: int = 1) -> bool:
+        """ True if the episode was grabbed in this version or a newer one """
+        with self._lock:
+            self._refresh()
+            grabbed = self._episodes.get(item, dict()).get(season, dict()).get(episode)
+        return grabbed is not None and grabbed >= version
+
+    def record(self, grabs) -> None:
+        """ Remembers every (item, season, episode, version) tuple, committed at once """
+        grabs = list(grabs)
+        if not grabs:
+            return
+
+        with self._lock:
+            self._db.executemany("INSERT INTO episodes VALUES (?, ?, ?, ?) ON CONFLICT (item, season, episode) "
+                                 "DO UPDATE SET version = MAX(version, excluded.version)", grabs)
+            self._db.commit()
+            for item, season, episode, version in grabs:
+                episodes = self._episodes.setdefault(item, dict()).setdefault(season, dict())
+                episodes[episode] = max(version, episodes.get(episode, 0))
+
+    def progress(self, item: str) -> dict:
+        """ Get {season: sorted list of episodes} grabbed for item """
+        with self._lock:
+            self._refresh()
+            return {season : sorted(episodes) for season, episodes in sorted(self._episodes.get(item, dict()).items())}
+
+    def format_progress(self, item: str) -> str:
+        """ The grabbed episodes of item as compact ranges, e.g. 'S1: 1-5, 7' """
+        parts = list()
+        for season, episodes in self.progress(item).items():
+            ranges = list()
+            for episode in episodes:
+                if ranges and episode.is_integer() and ranges[-1][1].is_integer() and episode == ranges[-1][1] + 1:
+                    ranges[-1][1] = episode
+                else:
+                    ranges.append([episode, episode])
+            text = ", ".join(_episode_text(first) if first == last else f"{_episode_text(first)}-{_episode_text(last)}"
+                             for first, last in ranges)
+            parts.append(f"S{season}: {text}")
+
+        return "; ".join(parts)
+
+    def _refresh(self):
+        """ Reloads the episodes if another connection committed since they were read, costs one pragma otherwise """
+        data_version = self._db.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self._episodes = dict()
+            for item, season, episode, version in self._db.execute("SELECT item, season, episode, version FROM episodes"):
+                self._episodes.setdefault(item, dict()).setdefault(season, dict())[episode] = version
+            self._data_version = data_version
+
+
+def _episode_text(episode: float) -> str:
+    return str(int(episode)) if episode.is_integer() else str(episode)
@@ -0,0 +1,138 @@
+import os #paths, atomic replace
+import json #state file
+import hashlib #body hash
+from config_store import file_lock #shared state file
+
+
+class FeedCache:
+
+    def __init__(self, path: str):
+        """
+        Keep the HTTP validators (ETag / Last-Modified) and a hash of the body
+        of every polled feed, so unchanged feeds are not parsed and scanned again.
+
+        The state is only committed with mark_scanned() once a cycle finished
+        scanning the feed, together with a scan key describing what it was scanned
+        for (the watchlist and rules), so a changed watchlist always rescans.
+        The last scanned body of every feed is kept in the directory named
+        like path without its extension, to be served while the feed is down.
+
+        Methods
+        -------
+        fetch(url, scan_key, timeout)
+            Returns the feed body, or None if it did not change since it was
+            last scanned with the same scan key
+
+        mark_scanned(url, scan_key, newest_id)
+            Commits the validators of the last fetch of url, and the id
+            of its newest entry
+
+        newest_id(url, scan_key)
+            Get the id of the newest entry of the last scan with the same scan key
+
+        last_body(url, scan_key)
+            Get the last scanned body of url instead of fetching it
+        """
+        self._path = path
+        self._bodies_dir = os.path.splitext(path)[0]
+        self._pending = dict()
+        self._pending_bodies = dict()
+        self._state = self._read()
+
+    def fetch(self, url: str, scan_key: str = '', timeout: float = 30.0):
+        """ Conditionally GET url, returns the body or None if unchanged """
+        import requests #conditional GET, loaded with the first fetch
+        state = self._state.get(url, dict())
+        same_scan = state.get('scan_key') == scan_key
+
+        headers = dict()
+        if same_scan:
+            if state.get('etag'):
+                headers['If-None-Match'] = state['etag']
+            if state.get('last_modified'):
+                headers['If-Modified-Since'] = state['last_modified']
+
+        response = requests.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+
+        body = response.content
+        body_hash = hashlib.sha256(body).hexdigest()
+        self._pending[url] = {'etag' : response.headers.get('ETag', ''),
+                              'last_modified' : response.headers.get('Last-Modified', ''),
+                              'hash' : body_hash}
+
+        # the server ignored the validators but sent the same feed
+        if same_scan and state.get('hash') == body_hash:
+            return None
+
+        self._pending_bodies[url] = body
+        return body
+
+    def newest_id(self, url: str, scan_key: str = ''):
+        """ The id of the newest entry of the last scan, None if it was scanned for something else """
+        state = self._state.get(url, dict())
+        if state.get('scan_key') != scan_key:
+            return None
+
+        return state.get('newest_id') or None
+
+    def last_body(self, url: str, scan_key: str = ''):
+        """
+        The last scanned body of url, to be scanned with scan_key and committed with mark_scanned()
+        like a fetched one. None when there is none, or it was already scanned with scan_key.
+        """
+        state = self._state.get(url)
+        if state is None or state.get('scan_key') == scan_key:
+            return None
+
+        try:
+            with open(self._body_file(url), 'rb') as body_file:
+                body = body_file.read()
+        except OSError:
+            return None
+
+        self._pending[url] = {key : state.get(key, '') for key in ('etag', 'last_modified', 'hash')}
+        return body
+
+    def mark_scanned(self, url: str, scan_key: str = '', newest_id: str = '') -> None:
+        """ Commits the validators of the last fetch of url after it was fully scanned """
+        state = self._pending.pop(url, None)
+        if state is None:
+            return
+
+        state['scan_key'] = scan_key
+        # an empty scan (nothing new before the previous newest entry) keeps the previous one
+        state['newest_id'] = newest_id or self._state.get(url, dict()).get('newest_id', '')
+        body = self._pending_bodies.pop(url, None)
+
+        # other processes polling the same feeds commit to the same files, only this feed is replaced
+        with file_lock(f"{self._path}.lock"):
+            self._state = self._read()
+            if body is not None and (state['hash'] != self._state.get(url, dict()).get('hash')
+                                     or not os.path.isfile(self._body_file(url))):
+                os.makedirs(self._bodies_dir, exist_ok=True)
+                tmp_path = f"{self._body_file(url)}.tmp"
+                with open(tmp_path, 'wb') as body_file:
+                    body_file.write(body)
+                os.replace(tmp_path, self._body_file(url))
+
+            self._state[url] = state
+            tmp_path = f"{self._path}.tmp"
+            with open(tmp_path, 'w') as state_file:
+                json.dump(self._state, state_file, indent=1)
+            os.replace(tmp_path, self._path)
+
+    def _read(self):
+        if os.path.isfile(self._path):
+            try:
+                with open(self._path, 'r') as state_file:
+                    return json.load(state_file)
+            except (OSError, ValueError):
+                pass
+
+        return dict()
+
+    def _body_file(self, url):
+        return f"{self._bodies_dir}/{hashlib.sha1(url.encode()).hexdigest()}.xml"
@@ -0,0 +1,169 @@
+import os #atomic replace
+import json #state file
+import time #clock
+import random #backoff jitter
+import bisect #histogram buckets
+import threading #lock
+from config_store import file_lock #shared state file
+
+# upper bounds in seconds of the fetch latency histogram, the last bucket takes everything slower
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class CircuitOpen(Exception):
+    """ Raised for a feed that is skipped until its circuit breaker lets a probe through """
+
+
+class FeedHealth:
+
+    def __init__(self, path: str = None, failure_threshold: int = 3, backoff: float = 60.0,
+                 max_backoff: float = 3600.0, jitter: float = 0.1):
+        """
+        Per feed health: a fetch latency histogram, consecutive failures and a circuit breaker.
+
+        After failure_threshold consecutive failures a feed is skipped for backoff seconds,
+        doubling with every further failure up to max_backoff (scaled by a random +-jitter
+        fraction). Once that passes one cycle probes it again, a success closes the breaker.
+        With path the state is kept in a JSON file shared by every process polling the feeds
+        (one-shot runs included), re-read when it changed and updated under a lock file.
+
+        Methods
+        -------
+        allow(url)
+            Check whether url should be fetched now
+
+        record_success(url, seconds) / record_failure(url, seconds, error)
+            Record the outcome of a fetch
+
+        retry_at(url)
+            The time at which a skipped feed is probed again
+
+        snapshot()
+            Get the health of every feed as a dictionary
+        """
+        self._path = path
+        self._failure_threshold = failure_threshold
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._jitter = jitter
+        self._lock = threading.Lock()
+        self._feeds = dict()
+        self._stamp = None
+        self._reload_if_changed()
+
+    def allow(self, url: str, now: float = None) -> bool:
+        """ False while the breaker of url is open, True otherwise (and once for a probe after the backoff) """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._reload_if_changed()
+            state = self._feeds.get(url)
+            if state is None or state['open_until'] == 0:
+                return True
+            if now < state['open_until']:
+                return False
+
+        def probe(state):
+            # another process may have taken the probe in the meantime
+            if state['open_until'] == 0:
+                return True
+            if now < state['open_until']:
+                return False
+            # half open: this fetch is the probe, others keep skipping until it reports back
+            state['open_until'] = now + self._delay(state['failures'])
+            return True
+
+        return self._update(url, probe)
+
+    def record_success(self, url: str, seconds: float) -> None:
+        def success(state):
+            self._observe(state, seconds)
+            state['failures'] = 0
+            state['open_until'] = 0
+            state['last_success'] = time.time()
+
+        self._update(url, success)
+
+    def record_failure(self, url: str, seconds: float, error=None) -> None:
+        def failure(state):
+            self._observe(state, seconds)
+            state['failures'] += 1
+            state['last_error'] = str(error or '')
+            if state['failures'] >= self._failure_threshold:
+                state['open_until'] = time.time() + self._delay(state['failures'])
+
+        self._update(url, failure)
+
+    def retry_at(self, url: str) -> float:
+        """ The time at which url is fetched again, 0 when it is not skipped """
+        with self._lock:
+            self._reload_if_changed()
+            return self._feeds.get(url, dict()).get('open_until', 0)
+
+    def snapshot(self) -> dict:
+        """ Get {url: {failures, open_until, last_success, last_error, latency}} """
+        with self._lock:
+            self._reload_if_changed()
+            return json.loads(json.dumps(self._feeds))
+
+    def _state(self, url):
+        if url not in self._feeds:
+            self._feeds[url] = {'failures' : 0, 'open_until' : 0, 'last_success' : 0, 'last_error' : '',
+                                'latency' : {'buckets' : list(LATENCY_BUCKETS),
+                                             'counts' : [0] * (len(LATENCY_BUCKETS) + 1),
+                                             'sum' : 0.0, 'count' : 0}}
+        return self._feeds[url]
+
+    @staticmethod
+    def _observe(state, seconds):
+        latency = state['latency']
+        latency['counts'][bisect.bisect_left(latency['buckets'], seconds)] += 1
+        latency['sum'] += seconds
+        latency['count'] += 1
+
+    def _delay(self, failures):
+        delay = min(self._max_backoff, self._backoff * 2 ** max(0, failures - self._failure_threshold))
+        return delay * random.uniform(1 - self._jitter, 1 + self._jitter)
+
+    def _update(self, url, change):
+        """ Applies change(state) to the newest state of url and saves it, returns what change returned """
+        with self._lock:
+            if not self._path:
+                return change(self._state(url))
+
+            with file_lock(f"{self._path}.lock"):
+                self._stamp = None
+                self._reload_if_changed()
+                result = change(self._state(url))
+                tmp_path = f"{self._path}.tmp"
+                with open(tmp_path, 'w') as state_file:
+                    json.dump(self._feeds, state_file, indent=1)
+                os.replace(tmp_path, self._path)
+                self._stamp = _file_stamp(self._path)
+
+            return result
+
+    def _reload_if_changed(self):
+        """ Re-reads the state file when another process changed it, costs one stat otherwise """
+        if not self._path:
+            return
+
+        stamp = _file_stamp(self._path)
+        if stamp == self._stamp:
+            return
+        self._stamp = stamp
+        if stamp is None:
+            return
+        try:
+            with open(self._path, 'r') as state_file:
+                self._feeds = json.load(state_file)
+        except (OSError, ValueError):
+            pass
+
+
+def _file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    return (stat.st_mtime_ns, stat.st_size)
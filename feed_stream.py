@@ -0,0 +1,83 @@
+import xml.etree.ElementTree as ET #pull parser
+from collections import namedtuple #entries
+
+CHUNK_SIZE = 16 * 1024
+
+
+class FeedEntry(namedtuple('FeedEntry', ['title', 'link', 'id', 'subsplease_infohash'])):
+    """ A feed entry, readable like a feedparser entry (attributes and get()) """
+    __slots__ = ()
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) or default
+
+
+def iter_entries(body: bytes, stop_at: str = None):
+    """
+    Lazily yields the entries of an RSS or Atom document, newest first,
+    feeding the body to a pull parser in chunks so nothing past the last
+    yielded entry is parsed.
+
+    Stops before the entry whose id (GUID) is stop_at: feeds list newest
+    entries first, so everything from there on was handled by an earlier cycle.
+    Malformed documents, and documents without any recognized entry element,
+    fall back to feedparser for the entries not yielded yet.
+    """
+    parser = ET.XMLPullParser(events=('end',))
+    found = 0
+    yielded = 0
+    try:
+        for offset in range(0, len(body), CHUNK_SIZE):
+            parser.feed(body[offset:offset + CHUNK_SIZE])
+            for event, element in parser.read_events():
+                # local names compare like feedparser compares them, lowercased and in any
+                # namespace (RSS 2.0 item, RSS 1.0 / RDF item, Atom entry)
+                if _local_name(element.tag) not in ('item', 'entry'):
+                    continue
+
+                found += 1
+                entry = _to_entry(element)
+                element.clear()
+                if stop_at is not None and entry.id == stop_at:
+                    return
+                yielded += 1
+                yield entry
+        parser.close()
+    except ET.ParseError:
+        yield from _feedparser_entries(body, yielded, stop_at)
+        return
+
+    # a format the pull parser does not know, let feedparser make sense of it
+    if not found and body.strip():
+        yield from _feedparser_entries(body, 0, stop_at)
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1].lower()
+
+
+def _to_entry(element):
+    fields = {'title' : '', 'link' : '', 'id' : '', 'subsplease_infohash' : ''}
+    for child in element:
+        tag = _local_name(child.tag)
+        if tag == 'title':
+            fields['title'] = (child.text or '').strip()
+        elif tag == 'link':
+            # atom links keep the url in href
+            fields['link'] = (child.text or child.get('href') or '').strip()
+        elif tag in ('guid', 'id'):
+            fields['id'] = (child.text or '').strip()
+        elif tag == 'infohash':
+            fields['subsplease_infohash'] = (child.text or '').strip()
+
+    return FeedEntry(**fields)
+
+
+def _feedparser_entries(body, skip, stop_at):
+    import feedparser #lenient fallback
+
+    for entry in feedparser.parse(body)['entries'][skip:]:
+        if stop_at is not None and entry.get('id') == stop_at:
+            return
+        yield FeedEntry(entry.get('title', ''), entry.get('link', ''), entry.get('id', ''),
+                        entry.get('subsplease_infohash', ''))
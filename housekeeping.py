@@ -0,0 +1,202 @@
+import os #scandir, removal
+import json #index file
+import time #file ages
+import threading #lock
+from collections import namedtuple #scan results
+from concurrent.futures import ThreadPoolExecutor #parallel directory scans
+from config_store import file_lock #shared index file
+from release_parser import parse_release, episode_label #episode files
+
+# a show kept in dir_path: its normalized name and retention, keep newest episodes (None: all)
+# and keep_days (None: forever)
+ShowRetention = namedtuple('ShowRetention', ['dir_path', 'show', 'keep', 'keep_days'])
+
+# a file the housekeeping removes and why: 'superseded' (a newer version is on disk),
+# 'retention' (past the keep newest episodes), 'expired' (older than keep_days) or 'stale torrent'
+Obsolete = namedtuple('Obsolete', ['path', 'show', 'episode', 'reason', 'size'])
+
+# names of files still being written by the torrent client or a delivery backend
+_INCOMPLETE = ('.!qb', '.part', '.tmp', '.crdownload')
+
+
+class Housekeeper:
+
+    def __init__(self, index_path: str, max_workers: int = 8):
+        """
+        Finds obsolete episodes and stale .torrent/.magnet files, and removes them.
+
+        Directories are listed with os.scandir on a thread pool. The listings are kept
+        in a JSON index at index_path together with the mtime of their directory,
+        so a repeated scan only lists the directories that changed since. The index
+        also keeps the time of the last collect(), so runs can be spaced out across processes:
+        it is shared by every process housekeeping the same folders, re-read when it changed
+        and merged under a lock file.
+
+        Methods
+        -------
+        collect(shows, torrent_dirs, torrent_max_age_days)
+            Get the Obsolete files of the ShowRetention shows and the torrent folders
+
+        remove(obsolete)
+            Deletes the files, returns the Obsolete files that could not be deleted
+
+        last_run()
+            The time of the last collect(), 0 if there was none
+        """
+        self._index_path = index_path
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="housekeeping")
+        self._lock = threading.Lock()
+        # dir_path -> {'mtime' : mtime_ns, 'entries' : [[name, size, mtime], ...]} of its files
+        self._index = dict()
+        self._last_run = 0
+        self._stamp = None
+        self._reload_if_changed()
+
+    def last_run(self) -> float:
+        with self._lock:
+            self._reload_if_changed()
+            return self._last_run
+
+    def collect(self, shows, torrent_dirs=(), torrent_max_age_days: float = 0, now: float = None) -> list:
+        """
+        Get the Obsolete files: older versions of an episode, episodes past the retention of their
+        ShowRetention, and .torrent/.magnet files in torrent_dirs older than torrent_max_age_days (0 keeps them).
+        """
+        now = time.time() if now is None else now
+        shows = list(shows)
+        torrent_dirs = list(torrent_dirs) if torrent_max_age_days > 0 else []
+        listings = self._scan([show.dir_path for show in shows] + torrent_dirs)
+
+        obsolete = list()
+        for show in shows:
+            obsolete.extend(self._obsolete_episodes(show, listings[show.dir_path], now))
+
+        oldest_kept = now - torrent_max_age_days * 86400
+        for dir_path in dict.fromkeys(torrent_dirs):
+            for name, size, mtime in listings[dir_path]:
+                if name.endswith(('.torrent', '.magnet')) and mtime < oldest_kept:
+                    obsolete.append(Obsolete(os.path.join(dir_path, name), '', '', 'stale torrent', size))
+
+        return obsolete
+
+    def remove(self, obsolete) -> list:
+        """ Deletes every Obsolete file, returns the ones that could not be deleted """
+        failed = list()
+        for entry in obsolete:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                failed.append(entry)
+
+        return failed
+
+    @staticmethod
+    def _obsolete_episodes(show, files, now):
+        # (season, episode) -> [(version, name, size, mtime)] of the files of show
+        episodes = dict()
+        for name, size, mtime in files:
+            if name.lower().endswith(_INCOMPLETE + ('.torrent', '.magnet')):
+                continue
+            release = parse_release(name)
+            if release is None or release.batch or release.show != show.show:
+                continue
+            episodes.setdefault((release.season, release.episode), list()).append((release.version, name, size, mtime))
+
+        obsolete = list()
+        oldest_kept = now - show.keep_days * 86400 if show.keep_days else None
+        for rank, key in enumerate(sorted(episodes, reverse=True)):
+            versions = sorted(episodes[key], reverse=True)
+            for i, (version, name, size, mtime) in enumerate(versions):
+                if i > 0 and version < versions[0][0]:
+                    reason = 'superseded'
+                elif show.keep and rank >= show.keep:
+                    reason = 'retention'
+                elif oldest_kept is not None and mtime < oldest_kept:
+                    reason = 'expired'
+                else:
+                    continue
+                release = parse_release(name)
+                obsolete.append(Obsolete(os.path.join(show.dir_path, name), show.show, episode_label(release),
+                                         reason, size))
+
+        return obsolete
+
+    def _scan(self, dir_paths) -> dict:
+        """ Get dir_path -> [(name, size, mtime)] of the files in every directory, listing only the changed ones """
+        dir_paths = list(dict.fromkeys(dir_paths))
+        # the workers read the index, which only changes under the lock once they are done
+        with self._lock:
+            self._reload_if_changed()
+            listings = dict(zip(dir_paths, self._pool.map(self._listing, dir_paths)))
+
+            # other processes housekeeping the same folders save to the same index, only the rescans are merged
+            with file_lock(f"{self._index_path}.lock"):
+                self._stamp = None
+                self._reload_if_changed()
+                for dir_path, (mtime, entries, rescanned) in listings.items():
+                    if rescanned:
+                        if mtime is None:
+                            self._index.pop(dir_path, None)
+                        else:
+                            self._index[dir_path] = {'mtime' : mtime, 'entries' : entries}
+                self._last_run = time.time()
+                self._save()
+
+        return {dir_path : [tuple(entry) for entry in entries] for dir_path, (mtime, entries, rescanned) in listings.items()}
+
+    def _listing(self, dir_path):
+        """ (mtime_ns, entries, rescanned) of dir_path, the indexed entries while its mtime did not change """
+        try:
+            mtime = os.stat(dir_path).st_mtime_ns
+        except OSError:
+            return None, [], dir_path in self._index
+
+        indexed = self._index.get(dir_path)
+        if indexed is not None and indexed['mtime'] == mtime:
+            return mtime, indexed['entries'], False
+
+        entries = list()
+        try:
+            with os.scandir(dir_path) as it:
+                for dir_entry in it:
+                    if dir_entry.is_file(follow_symlinks=False):
+                        stat = dir_entry.stat(follow_symlinks=False)
+                        entries.append([dir_entry.name, stat.st_size, stat.st_mtime])
+        except OSError:
+            return None, [], True
+
+        return mtime, entries, True
+
+    def _save(self):
+        tmp_path = f"{self._index_path}.tmp"
+        with open(tmp_path, 'w') as index_file:
+            json.dump({'last_run' : self._last_run, 'dirs' : self._index}, index_file)
+        os.replace(tmp_path, self._index_path)
+        self._stamp = _file_stamp(self._index_path)
+
+    def _reload_if_changed(self):
+        """ Re-reads the index when another process saved it, costs one stat otherwise """
+        stamp = _file_stamp(self._index_path)
+        if stamp == self._stamp:
+            return
+        self._stamp = stamp
+        if stamp is None:
+            return
+        try:
+            with open(self._index_path, 'r') as index_file:
+                stored = json.load(index_file)
+            self._index = stored.get('dirs', dict())
+            self._last_run = stored.get('last_run', 0)
+        except (OSError, ValueError, AttributeError):
+            pass
+
+
+def _file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    return (stat.st_mtime_ns, stat.st_size)
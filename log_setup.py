@@ -0,0 +1,160 @@
+import os #paths, retention
+import sys #entry point name
+import gzip #compressed rotations
+import time #rotation times
+import queue #log records
+import shutil #compression
+import atexit #flush on exit
+import logging #logging
+import datetime #rotation names, midnight
+import threading #configure once
+import multiprocessing #child process names
+import logging.handlers #queue and rotating handlers
+from config_store import file_lock #shared log files
+
+LOG_FORMAT = '%(asctime)s %(levelname)s %(message)s'
+DATE_FORMAT = '%d/%m/%Y %H:%M:%S'
+
+_listener = None
+_queue_handler = None
+_configure_lock = threading.Lock()
+
+
+class RotatingGzipHandler(logging.handlers.BaseRotatingHandler):
+
+    def __init__(self, filename: str, max_bytes: int = 5 * 1024 * 1024, backup_count: int = 30,
+                 max_age_days: float = 30):
+        """
+        A file handler that rotates once a day and whenever the file would grow past max_bytes.
+
+        Rotated files are gzipped next to it as '<name>.<timestamp>.log.gz'. Only the
+        backup_count newest of them are kept, and none older than max_age_days
+        (0 turns either limit off).
+
+        Several processes can log to the same file: every record is written under a lock
+        file and the file is only open while writing it, so whichever process rotates it
+        (a file held open elsewhere cannot be removed on Windows) leaves the others writing
+        to the new one. Whether to rotate is decided from the file itself, its size and
+        whether it was last written before today.
+        """
+        super().__init__(filename, 'a', encoding='utf-8', delay=True)
+        self._max_bytes = max_bytes
+        self._backup_count = backup_count
+        self._max_age_days = max_age_days
+        self._stem = os.path.splitext(self.baseFilename)[0]
+
+    def emit(self, record) -> None:
+        try:
+            with file_lock(f"{self.baseFilename}.lock"):
+                try:
+                    super().emit(record)
+                finally:
+                    if self.stream is not None:
+                        self.stream.close()
+                        self.stream = None
+        except Exception:
+            self.handleError(record)
+
+    def shouldRollover(self, record) -> bool:
+        try:
+            stat = os.stat(self.baseFilename)
+        except OSError:
+            return False
+
+        if not stat.st_size:
+            return False
+        if stat.st_mtime < self._midnight():
+            return True
+
+        return self._max_bytes > 0 and stat.st_size + len(self.format(record)) + 1 >= self._max_bytes
+
+    def doRollover(self) -> None:
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+        if os.path.isfile(self.baseFilename) and os.path.getsize(self.baseFilename):
+            # timestamps down to microseconds keep the names unique and sorted oldest first
+            stamp = datetime.datetime.now().strftime('%Y-%m-%d_%H%M%S_%f')
+            dest_path = f"{self._stem}.{stamp}.log.gz"
+            with open(self.baseFilename, 'rb') as source, gzip.open(dest_path, 'wb') as dest:
+                shutil.copyfileobj(source, dest)
+            os.remove(self.baseFilename)
+
+        self._prune()
+
+    def _prune(self):
+        """ Drops the rotated files past the retention limits """
+        folder = os.path.dirname(self.baseFilename)
+        prefix = f"{os.path.basename(self._stem)}."
+        rotated = sorted((entry.path, entry.stat().st_mtime) for entry in os.scandir(folder)
+                         if entry.name.startswith(prefix) and entry.name.endswith('.log.gz'))
+
+        oldest_kept = time.time() - self._max_age_days * 86400 if self._max_age_days > 0 else 0
+        expired = len(rotated) - self._backup_count if self._backup_count > 0 else 0
+        for i, (path, mtime) in enumerate(rotated):
+            if i < expired or mtime < oldest_kept:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _midnight() -> float:
+        return datetime.datetime.combine(datetime.date.today(), datetime.time()).timestamp()
+
+
+def log_name() -> str:
+    """
+    The log file name of this process: the entry point script ('main', 'daemon', 'cli', 'telegram_bot'),
+    with the process name appended in multiprocessing children. 'rss_downloader' for interactive sessions.
+    """
+    name = os.path.splitext(os.path.basename(sys.argv[0] if sys.argv else ''))[0] or 'rss_downloader'
+    if name in ('-c', '-m'):
+        name = 'rss_downloader'
+    process = multiprocessing.current_process().name
+    if process != 'MainProcess':
+        name = f"{name}-{process}"
+
+    return name
+
+
+def configure_logging(log_dir: str, level: int = logging.INFO, max_bytes: int = 5 * 1024 * 1024,
+                      backup_count: int = 30, max_age_days: float = 30, name: str = None) -> None:
+    """
+    Sends the records of the root logger through a queue to a RotatingGzipHandler
+    writing '<log_dir>/<name>.log' on a background thread, so logging calls only enqueue.
+    Every entry point writes its own file (name defaults to log_name()), overlapping
+    runs of the same one (cron runs of the CLI) share it, see RotatingGzipHandler.
+    Only the first call of a process configures anything.
+    """
+    global _listener, _queue_handler
+    with _configure_lock:
+        if _listener is not None:
+            return
+
+        os.makedirs(log_dir, exist_ok=True)
+        file_handler = RotatingGzipHandler(f"{log_dir}/{name or log_name()}.log", max_bytes, backup_count, max_age_days)
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT, DATE_FORMAT))
+
+        records = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(records, file_handler, respect_handler_level=True)
+        _listener.start()
+        # records still queued are written before the process exits
+        atexit.register(stop_logging)
+
+        _queue_handler = logging.handlers.QueueHandler(records)
+        root = logging.getLogger()
+        root.addHandler(_queue_handler)
+        root.setLevel(level)
+
+
+def stop_logging() -> None:
+    """ Writes out the queued records and stops the background thread, undoing configure_logging() """
+    global _listener, _queue_handler
+    with _configure_lock:
+        if _listener is not None:
+            logging.getLogger().removeHandler(_queue_handler)
+            _listener.stop()
+            _listener.handlers[0].close()
+            _listener = _queue_handler = None
@@ -0,0 +1,158 @@
+import json #json log lines
+import time #durations
+import logging #json sink
+import threading #lock, endpoint thread
+from contextlib import contextmanager #stage()
+
+
+class Metrics:
+
+    def __init__(self, sinks=None):
+        """
+        Per cycle stage durations and counters of the download cycle.
+
+        Stages (feed_fetch, parse, match, dedup, torrent_fetch, qbit_submit) add up
+        their durations in seconds, counters (entries_scanned, matches, bytes_fetched,
+        retries...) add up events. When a cycle ends its record is handed to every sink.
+
+        Methods
+        -------
+        stage(name)
+            Context manager timing a stage
+
+        add_time(name, seconds) / count(name, n)
+            Record a duration or counter directly
+
+        begin_cycle() / end_cycle()
+            Reset the record / emit it to the sinks
+
+        add_sink(sink)
+            Register an object with an emit(record) method
+        """
+        self._lock = threading.Lock()
+        self._sinks = list(sinks or [])
+        self._stages = dict()
+        self._counters = dict()
+        self._cycle_start = time.perf_counter()
+
+    def add_sink(self, sink) -> None:
+        with self._lock:
+            self._sinks.append(sink)
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._stages[name] = self._stages.get(name, 0.0) + seconds
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def begin_cycle(self) -> None:
+        with self._lock:
+            self._stages = dict()
+            self._counters = dict()
+            self._cycle_start = time.perf_counter()
+
+    def end_cycle(self) -> dict:
+        """ Emits the record of the cycle to every sink and returns it """
+        with self._lock:
+            record = {'cycle_seconds' : time.perf_counter() - self._cycle_start,
+                      'stages' : dict(self._stages),
+                      'counters' : dict(self._counters)}
+            sinks = list(self._sinks)
+
+        for sink in sinks:
+            try:
+                sink.emit(record)
+            except Exception:
+                logging.getLogger().exception("Metrics sink failed")
+
+        return record
+
+
+class JsonLogSink:
+
+    def __init__(self, logger: logging.Logger = None):
+        """ Writes every cycle record as one JSON line to the log """
+        self._logger = logger or logging.getLogger()
+
+    def emit(self, record: dict) -> None:
+        self._logger.info(json.dumps({'metrics' : record}, sort_keys=True))
+
+
+class PrometheusSink:
+
+    def __init__(self, prefix: str = 'rss_downloader'):
+        """
+        Accumulates cycle records as Prometheus counters and gauges.
+
+        Methods
+        -------
+        render()
+            The text exposition format of every metric
+
+        serve(port)
+            Serves render() on http://0.0.0.0:port/metrics from a daemon thread
+        """
+        self._prefix = prefix
+        self._lock = threading.Lock()
+        self._cycles = 0
+        self._last_cycle = 0.0
+        self._stage_seconds = dict()
+        self._counters = dict()
+
+    def emit(self, record: dict) -> None:
+        with self._lock:
+            self._cycles += 1
+            self._last_cycle = record['cycle_seconds']
+            for name, seconds in record['stages'].items():
+                self._stage_seconds[name] = self._stage_seconds.get(name, 0.0) + seconds
+            for name, value in record['counters'].items():
+                self._counters[name] = self._counters.get(name, 0) + value
+
+    def render(self) -> str:
+        prefix = self._prefix
+        with self._lock:
+            lines = [f"# TYPE {prefix}_cycles_total counter",
+                     f"{prefix}_cycles_total {self._cycles}",
+                     f"# TYPE {prefix}_last_cycle_seconds gauge",
+                     f"{prefix}_last_cycle_seconds {self._last_cycle:.6f}",
+                     f"# TYPE {prefix}_stage_seconds_total counter"]
+            for name, seconds in sorted(self._stage_seconds.items()):
+                lines.append(f'{prefix}_stage_seconds_total{{stage="{name}"}} {seconds:.6f}')
+            for name, value in sorted(self._counters.items()):
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                lines.append(f"{prefix}_{name}_total {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int):
+        import http.server #prometheus endpoint, only loaded when served
+        sink = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path != '/metrics':
+                    self.send_error(404)
+                    return
+                body = sink.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = http.server.ThreadingHTTPServer(('0.0.0.0', port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True, name="metrics-endpoint").start()
+        return server
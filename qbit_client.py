@@ -0,0 +1,135 @@
+import os #startfile
+import sys #platform
+import time #backoff
+import logging #logging
+import threading #lock
+import subprocess #launching qbittorrent outside windows
+import requests #web API session
+
+
+class QBitManager:
+
+    def __init__(self, port: str, user: str, password: str, qbit_path: str = '',
+                 timeout: float = 3.0, max_wait: float = 30.0):
+        """
+        A long lived client for the qBittorrent Web API (v2).
+
+        Logs in once and keeps the cookie session, logging in again only when the
+        API answers 401/403. Liveness is checked through the API itself; when
+        qBittorrent is not answering it is launched from qbit_path once, and
+        probed again with exponential backoff for up to max_wait seconds.
+
+        Methods
+        -------
+        add_links(links, savepath)
+            Adds magnet links or torrent URLs in a single torrents/add call,
+            returns True on success
+
+        is_alive()
+            Check whether the Web API answers
+        """
+        self._url = f"http://127.0.0.1:{port}/api/v2/"
+        self._user = user
+        self._password = password
+        self._qbit_path = qbit_path
+        self._timeout = timeout
+        self._max_wait = max_wait
+        self._logger = logging.getLogger()
+        self._lock = threading.Lock()
+        self._logged_in = False
+
+        self._session = requests.Session()
+        # the Web UI CSRF protection wants the Referer to match the host
+        self._session.headers['Referer'] = f"http://127.0.0.1:{port}"
+
+    def add_links(self, links, savepath: str = '') -> bool:
+        """ Adds all links to qBittorrent in one request, saved into savepath """
+        if not links:
+            return True
+
+        with self._lock:
+            if not self._ensure_running():
+                return False
+
+            data = {'urls' : '\n'.join(links)}
+            if savepath:
+                data['savepath'] = savepath
+
+            try:
+                response = self._request('torrents/add', data)
+            except requests.RequestException as e:
+                self._logger.error(f"Could not add torrents to qBittorrent: {e}")
+                return False
+
+            if response is None:
+                return False
+            # torrents/add answers 200 'Fails.' when it added nothing
+            if not (response.ok and response.text == 'Ok.'):
+                self._logger.error(f"qBittorrent did not add the torrents: {response.status_code} {response.text.strip()}")
+                return False
+
+            return True
+
+    def is_alive(self) -> bool:
+        """ Check whether the Web API answers """
+        try:
+            self._session.get(f"{self._url}app/version", timeout=self._timeout)
+        except requests.RequestException:
+            return False
+
+        return True
+
+    def _ensure_running(self):
+        if self.is_alive():
+            return True
+
+        if self._qbit_path and not self._launch():
+            return False
+
+        delay = 0.25
+        deadline = time.monotonic() + self._max_wait
+        while time.monotonic() < deadline:
+            time.sleep(delay)
+            if self.is_alive():
+                return True
+            delay = min(delay * 2, 4.0)
+
+        self._logger.error("qBittorrent Web API is not responding")
+        return False
+
+    def _launch(self):
+        """ Starts qBittorrent from qbit_path, False (logged) when it cannot be started """
+        self._logged_in = False
+        try:
+            if sys.platform == 'win32':
+                os.startfile(self._qbit_path)
+            else:
+                subprocess.Popen([self._qbit_path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                 start_new_session=True)
+        except OSError as e:
+            self._logger.error(f"Could not start qBittorrent from {self._qbit_path}: {e}")
+            return False
+
+        return True
+
+    def _login(self):
+        response = self._session.post(f"{self._url}auth/login", timeout=self._timeout,
+                                      data={'username' : self._user, 'password' : self._password})
+        self._logged_in = response.ok and response.text == 'Ok.'
+        if not self._logged_in:
+            self._logger.error("Entered wrong qbittorrent username/password")
+
+        return self._logged_in
+
+    def _request(self, path, data):
+        """ POSTs to the API, logging in first or again when the session expired """
+        if not self._logged_in and not self._login():
+            return None
+
+        response = self._session.post(f"{self._url}{path}", data=data, timeout=self._timeout)
+        if response.status_code in (401, 403):
+            if not self._login():
+                return None
+            response = self._session.post(f"{self._url}{path}", data=data, timeout=self._timeout)
+
+        return response
@@ -0,0 +1,131 @@
+import re #title patterns
+import logging #invalid filter rules
+from functools import lru_cache #memoized parsing
+from collections import namedtuple #parsed releases
+
+# group, normalized show name, season, first and last episode, resolution, batch flag, CRC and version
+Release = namedtuple('Release', ['group', 'show', 'season', 'episode', 'last_episode',
+                                 'resolution', 'batch', 'crc', 'version'])
+
+# [SubsPlease] Show Name S2 - 05v2 (1080p) [ABCDEF12].mkv
+# [SubsPlease] Show Name (01-12) (1080p) [Batch]
+_FANSUB = re.compile(r"""^\[(?P<group>[^\]]+)\]\s*(?P<show>.+?)
+                         (?:\s+-\s+(?P<episode>\d+(?:\.\d+)?)(?:v(?P<version>\d+))?
+                           |\s+\((?P<first>\d+)-(?P<last>\d+)\))
+                         (?P<rest>.*)$""", re.VERBOSE)
+
+# Show.Name.S01E05.1080p.WEB.x264-GROUP
+_SCENE = re.compile(r"""^(?P<show>.+?)[ ._]S(?P<season>\d{1,2})E(?P<episode>\d{1,4})(?:-?E(?P<last>\d{1,4}))?
+                         (?P<rest>.*?)(?:-(?P<group>[A-Za-z0-9]+))?(?:\.\w{2,4})?$""", re.VERBOSE | re.IGNORECASE)
+
+_RESOLUTION = re.compile(r"(\d{3,4}p)", re.IGNORECASE)
+_CRC = re.compile(r"\[([0-9A-F]{8})\]")
+_SEASON = re.compile(r"\b(?:s|season\s*)(\d{1,2})$|\b(\d{1,2})(?:st|nd|rd|th)\s+season$")
+_NOT_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_show(name: str) -> str:
+    """ Lowercased show name with punctuation, dots and underscores folded into single spaces,
+    and a trailing season written as 'sN' ('Season 2', '2nd Season' and 'S2' are all 's2') """
+    name = _NOT_ALNUM.sub(' ', name.lower()).strip()
+    season = _SEASON.search(name)
+    if season:
+        name = f"{name[:season.start()].strip()} s{int(season.group(1) or season.group(2))}"
+
+    return name
+
+
+@lru_cache(maxsize=4096)
+def parse_release(title: str):
+    """ Parse a release title into a Release, or None when the title is not recognized """
+    match = _FANSUB.match(title)
+    if match:
+        rest = match.group('rest')
+        show = normalize_show(match.group('show'))
+        season = _SEASON.search(show)
+        first = match.group('episode') or match.group('first')
+        resolution = _RESOLUTION.search(rest)
+        crc = _CRC.search(rest)
+        return Release(match.group('group'), show, int(season.group(1)) if season else 1,
+                       float(first), float(match.group('last') or first),
+                       resolution.group(1).lower() if resolution else '',
+                       match.group('first') is not None or '[batch]' in rest.lower(),
+                       crc.group(1) if crc else '', int(match.group('version') or 1))
+
+    match = _SCENE.match(title)
+    if match:
+        season = int(match.group('season'))
+        show = normalize_show(match.group('show'))
+        if season > 1:
+            show = f"{show} s{season}"
+        resolution = _RESOLUTION.search(match.group('rest'))
+        episode = float(match.group('episode'))
+        return Release(match.group('group') or '', show, season, episode, float(match.group('last') or episode),
+                       resolution.group(1).lower() if resolution else '', False, '', 1)
+
+    return None
+
+
+def episode_label(release) -> str:
+    """ A short label of the episodes in a Release, e.g. 'S1E05', 'S2E01-12', '' for None """
+    if release is None:
+        return ''
+
+    label = f"S{release.season}E{_number_text(release.episode)}"
+    if release.last_episode != release.episode:
+        label += f"-{_number_text(release.last_episode)}"
+    if release.version > 1:
+        label += f"v{release.version}"
+
+    return label
+
+
+def _number_text(number: float) -> str:
+    return f"{int(number):02d}" if number.is_integer() else str(number)
+
+
+def parse_filter(text: str) -> dict:
+    """
+    Parse a per-item filter such as 'resolution=1080p,720p; episodes=3-12; batch=yes'.
+    episodes takes 'N', 'N-M', 'N-' or '-M'. The retention rules 'keep=N' (newest episodes
+    kept on disk) and 'keep_days=D' are only used by the housekeeping.
+    """
+    rules = {'resolution' : None, 'min_episode' : None, 'max_episode' : None, 'batch' : False,
+             'keep' : None, 'keep_days' : None}
+    for part in text.split(';'):
+        if '=' not in part:
+            continue
+        key, value = (token.strip().lower() for token in part.split('=', 1))
+        # a typo in a hand edited rule drops that rule only
+        try:
+            if key == 'resolution':
+                rules['resolution'] = set(res.strip() for res in value.split(',') if res.strip())
+            elif key == 'episodes':
+                low, _, high = value.partition('-') if '-' in value else (value, '', value)
+                min_episode, max_episode = float(low) if low else None, float(high) if high else None
+                rules['min_episode'], rules['max_episode'] = min_episode, max_episode
+            elif key == 'batch':
+                rules['batch'] = value in ('yes', 'true', '1')
+            elif key == 'keep':
+                rules['keep'] = int(value)
+            elif key == 'keep_days':
+                rules['keep_days'] = float(value)
+        except ValueError:
+            logging.getLogger().warning(f"Ignoring the invalid filter rule '{part.strip()}'")
+
+    return rules
+
+
+def release_passes(release: Release, rules: dict = None) -> bool:
+    """ Check a parsed release against parse_filter() rules, batches are rejected unless allowed """
+    rules = rules or parse_filter('')
+    if release.batch and not rules['batch']:
+        return False
+    if rules['resolution'] and release.resolution not in rules['resolution']:
+        return False
+    if rules['min_episode'] is not None and release.last_episode < rules['min_episode']:
+        return False
+    if rules['max_episode'] is not None and release.episode > rules['max_episode']:
+        return False
+
+    return True
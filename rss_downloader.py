@@ -1,41 +1,53 @@
 import os #dir path, startfile
-import sys #exit
 import configparser #configparser
 import logging #logging
 import threading #thread
-import datetime #for the logs
-import requests #for .torrent downloads
-import psutil #check running processes
+import hashlib #watchlist fingerprint
+import time #stage timings
+from collections import namedtuple #feed definitions
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED #parallel feeds
+from watchlist_matcher import WatchlistMatcher #single pass title matching
+from release_parser import parse_release, normalize_show, parse_filter, release_passes, episode_label #episode aware matching
+from feed_cache import FeedCache #conditional GET
+from feed_health import FeedHealth, CircuitOpen #failing feed backoff
+from feed_stream import iter_entries #lazy feed parsing
+from seen_store import SeenStore #entry deduplication
+from episode_ledger import EpisodeLedger #grabbed episodes
+from torrent_cache import TorrentCache, normalize_infohash, infohash_from_magnet #payload identity
+from config_store import ConfigStore #config.ini access
+from metrics import Metrics, JsonLogSink #stage timings
+from log_setup import configure_logging #background log writing
+from housekeeping import Housekeeper, ShowRetention #obsolete downloads
+
+# requests, the qBittorrent client and the delivery backends are imported by the
+# methods that use them, so constructing a downloader, or only reading and
+# editing the watchlist, does not pay for them
+
+# a polled feed and the rules its entries are matched with
+Feed = namedtuple('Feed', ['name', 'url', 'download_method', 'has_dots', 'must_contain', 'timeout'])
+
+# the watchlist compiled for matching: substring automaton, fingerprint,
+# normalized show name -> [(item, dir_path)], item -> filter rules, exact matching on/off
+CompiledWatchlist = namedtuple('CompiledWatchlist', ['matcher', 'key', 'shows', 'filters', 'exact'])
 
 
-try:
-    import feedparser #feedparser
-except ImportError:
-    print("Module 'feedparser' not installed. Please install it via:")
-    print("pip install feedparser")
-    sys.exit()
-
-try:
-    from qbittorrent import Client #qbitorrent web-UI API
-except ImportError:
-    print("Module 'qbittorrent' not installed. Please install it via:")
-    print("pip install python-qbittorrent")
-    sys.exit()
-
 class RSSDownloader:
 
-    def __init__(self):
+    def __init__(self, base_dir: str = None):
         """
         Create a new RSS downloader instance,
         and read the config.ini file.
 
+        base_dir holds config.ini, the logs and the state files,
+        it defaults to the directory of this module.
+
         if config.ini does not exist,
         a new config.ini will be created and would need
         changing to fit the user.
 
         Methods
         -------
-        download()
+        download(cancel_event, dry_run)
             Runs a downloading cycle exactly once,
             return a list of downloaded items
 
@@ -48,6 +60,9 @@ class RSSDownloader:
         change_setting(setting, att)
             changes one of the settings
 
+        change_settings(settings)
+            changes several settings with a single write of config.ini
+
         get_watchlist()
             Get the current watchlist
         
@@ -57,94 +72,200 @@ class RSSDownloader:
         get_telegram_token()
             a Telegram specific method to get the bot token
 
+        add_items_to_watchlist(items, replace)
+            adds many item: path pairs with a single write of config.ini
+
+        get_last_cycle()
+            Get a report of what the last cycle matched and delivered
+
+        get_match_history()
+            Get (item, timestamp) pairs of past matches
+
+        get_item_status()
+            Get the last matched episode and match time of every item
+
+        get_progress(item)
+            Get the grabbed episodes of a watchlist item as {season: episodes}
+
+        get_progress_text(item)
+            Get the grabbed episodes of a watchlist item as compact ranges, e.g. 'S1: 1-5, 7'
+
+        add_metrics_sink(sink)
+            Register a sink (see metrics.py) receiving the stage timings of every cycle
+
         """
-        self._curr_dir = os.path.dirname(os.path.abspath(__file__))
-        os.makedirs(f"{self._curr_dir}/.logs", exist_ok=True)
+        self._curr_dir = os.path.abspath(base_dir) if base_dir else os.path.dirname(os.path.abspath(__file__))
         os.makedirs(f"{self._curr_dir}/Downloads", exist_ok=True)
         self._logger = logging.getLogger()
-        logging.basicConfig(filename=f'{self._curr_dir}/.logs/{datetime.date.today()}.log',
-                        format='%(asctime)s %(levelname)s %(message)s', datefmt='%d/%m/%Y %H:%M:%S',
-                        level=logging.INFO)
 
         if not os.path.isfile(f'{self._curr_dir}/config.ini'):
             self.__init_config_file()
 
-        self._config = configparser.ConfigParser()
-        self._config.read(f'{self._curr_dir}/config.ini')
+        self._config = ConfigStore(f'{self._curr_dir}/config.ini')
+        # the first instance of a process sets up logging, later ones (and other base dirs) reuse it
+        configure_logging(f"{self._curr_dir}/.logs",
+                          max_bytes=int(self._config.getfloat('SETTINGS', 'log_max_mb', fallback=5) * 1024 * 1024),
+                          backup_count=self._config.getint('SETTINGS', 'log_backups', fallback=30),
+                          max_age_days=self._config.getfloat('SETTINGS', 'log_retention_days', fallback=30))
         self._lock = threading.Lock()
-
-    def download(self):
+        self._cycle_lock = threading.Lock()
+        self._matchers = dict()
+        self._feed_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="feed-fetch")
+        self._feed_cache = FeedCache(f'{self._curr_dir}/feed_cache.json')
+        self._housekeeper = Housekeeper(f'{self._curr_dir}/scan_index.json')
+        self._feed_health = FeedHealth(f'{self._curr_dir}/feed_health.json',
+                                       failure_threshold=self._config.getint('SETTINGS', 'feed_failure_threshold', fallback=3),
+                                       backoff=self._config.getfloat('SETTINGS', 'feed_backoff', fallback=60),
+                                       max_backoff=self._config.getfloat('SETTINGS', 'feed_max_backoff', fallback=3600))
+
+        self._metrics = Metrics([JsonLogSink(self._logger)])
+        self._fetcher = None
+        self._qbit = None
+        self._backends = dict()
+        self._last_cycle = None
+        self._torrent_cache = None
+
+        self._ledger = EpisodeLedger(f'{self._curr_dir}/seen.db')
+        self._seen = SeenStore(f'{self._curr_dir}/seen.db')
+        # first run with the store, import whatever was already downloaded
+        seeded = self._seen.seed([dir_path for item, dir_path in self._watchlist_patterns().values()] +
+                                 [f"{self._curr_dir}/Downloads/"])
+        if seeded:
+            self._logger.info(f"Imported {seeded} existing downloads into the seen index")
+        self._seen.prune(self._config.getfloat('SETTINGS', 'seen_retention_days', fallback=180))
+
+    def download(self, cancel_event: threading.Event = None, dry_run: bool = False):
         #returns a list of (name, value) tuples for each entry in 'WATCHLIST'
+        # setting cancel_event stops the cycle before its next feed or before delivery
+        # a dry run matches and deduplicates but delivers and remembers nothing, see get_last_cycle()
         downloaded_items = list()
         
-        with self._lock:
-            rss_link = self._config.get('SETTINGS', 'rss_link_magent') if \
-                            (self._config.get('SETTINGS', 'download_method') == 'magnet') else \
-                            self._config.get('SETTINGS', 'rss_link_torr')
-                
-            feed = feedparser.parse(rss_link)
-            
-            watch_list = self._config.items(section="WATCHLIST")
-            for item, dir_path in watch_list:
-                if dir_path == '':
-                    dir_path = f"{self._config.get('SETTINGS', 'download_dir')}{item.title()}/"
-
-                # for trackers that name their torrents with dots intsead of spaces
-                if self._config.getboolean('SETTINGS', 'has_dots'):
-                    item = item.replace(" ", ".")
-
-                for entry in feed['entries']:
-                    # if item is found in entry titles (lowercased), satisfies additional rules,
-                    # and does not exist already in directory.
-                    if item in entry.title.lower() and \
-                    self._check_rules('SETTINGS', entry.title) and \
-                    not (os.path.isfile(dir_path + entry.title) or \
-                         os.path.isdir(dir_path + entry.title)):
-                        self._logger.info(f"Found new entry of {item.title()}")
-                        # magnet link OR .torrent download
-                        if self._config.getboolean('SETTINGS', 'qbit_integration') and \
-                            self._config.get('SETTINGS', 'download_method') == 'magnet':   
-                            self._qb_web(dir_path, entry.link)
-                            self._logger.info(f"Added {entry.title} to qBitorrent")
-                        elif not os.path.isfile(f"{self._curr_dir}/Downloads/{entry.title}.torrent"):
-                            self._dot_torr_download(entry.link, entry.title)
-
-                        downloaded_items.append(entry.title)
+        # cycles never overlap, while config reads and edits only wait for the snapshot below
+        with self._cycle_lock:
+            self._metrics.begin_cycle()
+            feeds, matchers, backends = self._cycle_snapshot()
+
+            # matches are handed to their delivery backend in one batch once every feed was scanned
+            pending = dict()
+            # entries published by several feeds are only taken once per cycle
+            cycle_keys = set()
+            cycle_episodes = dict()
+            scanned_feeds = list()
+
+            for feed, scan_key, entries in self._fetch_feeds(feeds, matchers):
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                watchlist = matchers[feed.has_dots]
+
+                match_seconds = dedup_seconds = 0.0
+                scanned = 0
+                newest_id = ''
+                for entry in entries:
+                    start = time.perf_counter()
+                    scanned += 1
+                    newest_id = newest_id or entry.get('id', '')
+                    entry_key = self._entry_key(entry)
+                    if entry_key in cycle_keys:
+                        continue
+
+                    matches = self._match(watchlist, entry.title)
+                    if not matches or not self._check_rules(feed.must_contain, entry.title):
+                        match_seconds += time.perf_counter() - start
+                        continue
+                    matched = time.perf_counter()
+                    match_seconds += matched - start
+
+                    matches = self._dedup(entry_key, entry, matches, cycle_episodes)
+                    dedup_seconds += time.perf_counter() - matched
+                    if not matches:
+                        continue
+
+                    cycle_keys.add(entry_key)
+                    self._logger.info(f"Found new entry of {matches[0][0].title()}")
+                    pending.setdefault(backends[feed.name], list()).append((feed, entry_key, entry, matches))
+
+                scanned_feeds.append((feed, scan_key, newest_id))
+                self._metrics.count('entries_scanned', scanned)
+                self._metrics.add_time('match', match_seconds)
+                self._metrics.add_time('dedup', dedup_seconds)
+
+            if cancel_event is not None and cancel_event.is_set():
+                self._logger.info("Download cycle cancelled")
+                self._metrics.count('cancelled')
+                self._last_cycle = self._cycle_report(pending, set(), self._metrics.end_cycle(), cancelled=True)
+                return downloaded_items
+
+            if dry_run:
+                self._logger.info("Dry run, nothing was delivered")
+                self._last_cycle = self._cycle_report(pending, set(), self._metrics.end_cycle(), dry_run=True)
+                return downloaded_items
+
+            downloaded_items, failed_links = self._deliver(pending, scanned_feeds)
+            self._housekeep(delivered=bool(downloaded_items))
+            self._last_cycle = self._cycle_report(pending, failed_links, self._metrics.end_cycle())
 
         return downloaded_items
 
     def add_item_to_watchlist(self, item: str, path: str = '') -> None:
         """ Adds an item to the watchlist along with an optional path """
         with self._lock:
-            self._config["WATCHLIST"][item] = path
-
-            with open(f'{self._curr_dir}/config.ini', 'w+') as configfile:
-                self._config.write(configfile)
+            self._reload_if_changed()
+            self._config.set('WATCHLIST', item, path)
+            self._matchers = dict()
 
             self._logger.info(f"Added {item} to watchlist")
 
+    def add_items_to_watchlist(self, items: dict, replace: bool = False) -> int:
+        """ Adds every item: path pair with a single write of config.ini,
+        with replace the items not in items are removed. Returns the number of items written. """
+        with self._lock:
+            self._reload_if_changed()
+            with self._config.batch():
+                if replace:
+                    for item, path in self._config.items('WATCHLIST'):
+                        if item not in items:
+                            self._config.remove_option('WATCHLIST', item)
+                for item, path in items.items():
+                    self._config.set('WATCHLIST', item, path)
+            self._matchers = dict()
+
+            self._logger.info(f"Imported {len(items)} items into the watchlist")
+            return len(items)
+
     def change_setting(self, setting: str, att: str):
         """ Changes attribute at setting """
+        self.change_settings({setting : att})
+
+    def change_settings(self, settings: dict):
+        """ Changes every setting: attribute pair in settings, written to config.ini at once """
         with self._lock:
-            self._config['SETTINGS'][setting] = att
-            with open(f'{self._curr_dir}/config.ini', 'w+') as configfile:
-                self._config.write(configfile)
+            self._reload_if_changed()
+            with self._config.batch():
+                for setting, att in settings.items():
+                    self._config.set('SETTINGS', setting, att)
+            self._matchers = dict()
+            self._qbit = None
+            self._backends = dict()
+            self._torrent_cache = None
 
     def get_settings(self) -> dict:
         """ Get all the current settings and their attributes as a dictionary """
         with self._lock:
-            settings_dict = dict(self._config.items(section='SETTINGS'))
+            self._reload_if_changed()
+            settings_dict = dict(self._config.items('SETTINGS'))
 
             return settings_dict
         
     def get_telegram_integration_status(self) -> bool:
         with self._lock:
+            self._reload_if_changed()
             return self._config.getboolean('SETTINGS', 'telegram_integration')
         
     def get_watchlist(self):
         """ Get the current watchlist """
         with self._lock:
-            watchlist = dict(self._config.items(section='WATCHLIST'))
+            self._reload_if_changed()
+            watchlist = dict(self._config.items('WATCHLIST'))
 
         return watchlist
 
@@ -152,21 +273,64 @@ class RSSDownloader:
         """ Removes an item from the watchlist, 
         returns False if item is not found in the list, and True if found. """
         with self._lock:
-            if item not in dict(self._config.items(section='WATCHLIST')):
-                print(f"{item} not in wathclist")
+            self._reload_if_changed()
+            if not self._config.remove_option('WATCHLIST', item):
+                self._logger.warning(f"{item} not in watchlist")
                 return False
             
-            self._config["WATCHLIST"].pop(item)
-            with open(f'{self._curr_dir}/config.ini', 'w+') as configfile:
-                self._config.write(configfile)
+            self._matchers = dict()
             self._logger.info((f"Removed {item} from watchlist"))
             
             return True
         
         
+    def get_last_cycle(self) -> dict:
+        """
+        Get the report of the last finished cycle: dry_run and cancelled flags,
+        matches as {feed, item, title, link, episode, delivered} dicts, and its metrics record.
+        None before the first cycle.
+        """
+        return self._last_cycle
+
+    def get_item_status(self) -> dict:
+        """ Get {item: (last matched episode or title, timestamp)} of every watchlist item matched before """
+        return {item : (episode_label(parse_release(title)) or title, seen_at)
+                for item, (title, seen_at) in self._seen.last_matches().items()}
+
+    def housekeep(self, dry_run: bool = False) -> list:
+        """
+        Removes obsolete episodes and stale .torrent/.magnet files now, even with auto_delete_obsolete off.
+        Returns them as {path, show, episode, reason, bytes, removed} dicts, a dry run only reports them.
+        """
+        return self._collect_obsolete(dry_run)
+
+    def get_feed_health(self) -> dict:
+        """
+        Get {url: {failures, open_until, last_success, last_error, latency}} of every fetched feed,
+        open_until is the time a skipped feed is probed again (0 while it is fetched every cycle)
+        """
+        return self._feed_health.snapshot()
+
+    def get_match_history(self) -> list:
+        """ Get (item, timestamp) pairs of every remembered match, oldest first """
+        return self._seen.match_times()
+
+    def get_progress(self, item: str) -> dict:
+        """ Get {season: sorted episodes} already grabbed for a watchlist item """
+        return self._ledger.progress(normalize_show(item))
+
+    def get_progress_text(self, item: str) -> str:
+        """ Get the episodes already grabbed for a watchlist item as compact ranges, e.g. 'S1: 1-5, 7' """
+        return self._ledger.format_progress(normalize_show(item))
+
+    def add_metrics_sink(self, sink) -> None:
+        """ Register a sink with an emit(record) method, called with the timings of every cycle """
+        self._metrics.add_sink(sink)
+
     def get_telegram_token(self)-> str:
         """ Get the telegram bot token """
         with self._lock:
+            self._reload_if_changed()
             token = self._config.get('SETTINGS', 'telegram_bot_token')
         
         return token
@@ -188,17 +352,418 @@ class RSSDownloader:
                             'download_dir' : f'{self._curr_dir}/Downloads/',
                             'download_method' : '.torrent file',
                             'has_dots' : 'no',
-                            'must_contain' : ''}
+                            'must_contain' : '',
+                            'seen_retention_days' : '180',
+                            'feed_timeout' : '30',
+                            'feed_failure_threshold' : '3',
+                            'feed_backoff' : '60',
+                            'feed_max_backoff' : '3600',
+                            'exact_match' : 'yes',
+                            'delivery_backend' : 'auto',
+                            'watch_dir' : f'{self._curr_dir}/Watch/',
+                            'watch_per_show' : 'yes',
+                            'rpc_url' : 'http://localhost:6800/jsonrpc',
+                            'rpc_method' : 'aria2.addUri',
+                            'rpc_token' : '',
+                            'log_max_mb' : '5',
+                            'log_backups' : '30',
+                            'log_retention_days' : '30',
+                            'torrent_cache_mb' : '64',
+                            'keep_episodes' : '0',
+                            'keep_days' : '0',
+                            'torrent_retention_days' : '14',
+                            'housekeeping_hours' : '24'}
         
         config['WATCHLIST'] = {'Item' : 'Path'}
+
+        # 'name = url' pairs, when empty the rss link of SETTINGS is used
+        config['FEEDS'] = {}
+
+        # 'item = resolution=1080p; episodes=1-12; batch=no' rules for recognized release names
+        config['FILTERS'] = {}
         
 
         with open(f'{self._curr_dir}/config.ini', 'w+') as configfile:
             config.write(configfile)
 
+
+    def _reload_if_changed(self):
+        """ Re-reads config.ini when another process (the GUI or the bot) changed it, costs one stat otherwise """
+        if self._config.reload_if_changed():
+            self._matchers = dict()
+            self._qbit = None
+            self._backends = dict()
+            self._torrent_cache = None
+            self._logger.info("Reloaded config.ini after an external change")
+
+    def _cycle_snapshot(self):
+        """ Get the feeds of a cycle with their matchers and delivery backends, the only part of a cycle under the lock """
+        with self._lock:
+            self._reload_if_changed()
+            feeds = self._get_feeds()
+            matchers = {feed.has_dots : self._get_matcher(feed.has_dots) for feed in feeds}
+            backends = {feed.name : self._get_backend(feed.download_method) for feed in feeds}
+
+        return feeds, matchers, backends
+
+    def _dedup(self, entry_key, entry, matches, cycle_episodes) -> list:
+        """
+        Get the (item, dir_path) matches that still need entry, an empty list when it was handled before
+        (or imported from disk) or every item already has its episode from any group, resolution or older version.
+        Accepted episodes are added to cycle_episodes, so other feeds of the same cycle drop them as well.
+        """
+        if entry_key in self._seen or entry.title in self._seen:
+            return []
+        infohash = self._infohash(entry)
+        if infohash and infohash in self._seen:
+            return []
+
+        release = parse_release(entry.title)
+        if release is not None and not release.batch:
+            matches = [(item, dir_path) for item, dir_path in matches
+                       if not self._episode_grabbed(item, release, cycle_episodes)]
+            if not matches:
+                self._metrics.count('duplicate_episodes')
+                return []
+            cycle_episodes.update(((normalize_show(item), release.season, release.episode), release.version)
+                                  for item, dir_path in matches)
+
+        self._metrics.count('matches')
+        return matches
+
+    def _deliver(self, pending: dict, scanned_feeds: list) -> list:
+        """
+        Hands the (feed, entry_key, entry, matches) lists of pending to their delivery backend, records what was
+        delivered and commits the (feed, scan_key, newest_id) scans of feeds without failed deliveries.
+        Returns one title per delivered match and the set of links that failed.
+        """
+        from delivery import Delivery #torrent client hand-off
+        downloaded_items = list()
+        failed_feeds = set()
+        failed_links = set()
+        delivered = list()
+
+        for backend, entries in pending.items():
+            deliveries = [Delivery(entry.title, entry.link, item, dir_path, self._infohash(entry))
+                          for feed, entry_key, entry, matches in entries
+                          for item, dir_path in matches]
+            # a failing backend only fails its own links, what the others delivered is still recorded
+            try:
+                with self._metrics.stage(backend.stage):
+                    failed = backend.deliver(deliveries)
+            except Exception:
+                self._logger.exception(f"Delivery to {backend.name} failed")
+                failed = set(delivery.link for delivery in deliveries)
+            failed_links.update(failed)
+            for feed, entry_key, entry, matches in entries:
+                if entry.link in failed:
+                    failed_feeds.add(feed.name)
+                else:
+                    self._logger.info(f"Delivered {entry.title} to {backend.name}")
+                    delivered.append((entry_key, entry, matches, backend.infohashes.get(entry.link, '')))
+                    downloaded_items.extend([entry.title] * len(matches))
+
+        grabs = list()
+        for entry_key, entry, matches, fetched_infohash in delivered:
+            self._seen.add(entry_key, entry.title, matches[0][0])
+            # the payload is remembered as well, so the same torrent under another title or GUID is skipped,
+            # from the feed or else from the fetched .torrent
+            infohash = self._infohash(entry) or fetched_infohash
+            if infohash and infohash != entry_key:
+                self._seen.add(infohash, entry.title, matches[0][0])
+            release = parse_release(entry.title)
+            if release is not None and not release.batch:
+                grabs.extend((normalize_show(item), release.season, release.episode, release.version)
+                             for item, dir_path in matches)
+        self._ledger.record(grabs)
+
+        # failed deliveries keep their feed unscanned so the next cycle retries them
+        for feed, scan_key, newest_id in scanned_feeds:
+            if feed.name not in failed_feeds:
+                self._feed_cache.mark_scanned(feed.url, scan_key, newest_id)
+
+        self._metrics.count('delivered', len(downloaded_items))
+        self._metrics.count('failed_feeds', len(failed_feeds))
+        return downloaded_items, failed_links
+
+    def _housekeep(self, delivered: bool) -> list:
+        """
+        The housekeeping at the end of a download cycle: with auto_delete_obsolete on, removes the obsolete files
+        after cycles that delivered something or when the last run is housekeeping_hours old.
+        It is recorded in the cycle metrics, and its errors are only logged.
+        """
+        with self._lock:
+            self._reload_if_changed()
+            if not self._config.getboolean('SETTINGS', 'auto_delete_obsolete', fallback=False):
+                return []
+            interval = self._config.getfloat('SETTINGS', 'housekeeping_hours', fallback=24) * 3600
+        if not delivered and time.time() - self._housekeeper.last_run() < interval:
+            return []
+
+        start = time.perf_counter()
+        try:
+            report = self._collect_obsolete()
+        except Exception:
+            self._logger.exception("Housekeeping failed")
+            return []
+        finally:
+            self._metrics.add_time('housekeeping', time.perf_counter() - start)
+
+        removed = [entry for entry in report if entry['removed']]
+        self._metrics.count('files_removed', len(removed))
+        self._metrics.count('bytes_freed', sum(entry['bytes'] for entry in removed))
+        return report
+
+    def _collect_obsolete(self, dry_run=False) -> list:
+        """ Collects the obsolete files of _retention_rules() and removes them unless dry_run, see housekeep() """
+        with self._lock:
+            self._reload_if_changed()
+            shows, torrent_dirs, torrent_days = self._retention_rules()
+
+        obsolete = self._housekeeper.collect(shows, torrent_dirs, torrent_days)
+        failed = set(obsolete if dry_run else self._housekeeper.remove(obsolete))
+
+        report = list()
+        for entry in obsolete:
+            removed = entry not in failed
+            if removed:
+                self._logger.info(f"Removed {entry.path} ({entry.reason})")
+            elif not dry_run:
+                self._logger.error(f"Could not remove {entry.path}")
+            report.append({'path' : entry.path, 'show' : entry.show, 'episode' : entry.episode,
+                           'reason' : entry.reason, 'bytes' : entry.size, 'removed' : removed})
+
+        return report
+
+    def _retention_rules(self):
+        """
+        Get the ShowRetention of every watchlist item (its FILTERS keep/keep_days, else the keep_episodes/keep_days
+        settings, 0 keeping everything), and the folders holding delivered .torrent/.magnet files with their max age.
+        """
+        config = self._config
+        keep = config.getint('SETTINGS', 'keep_episodes', fallback=0)
+        keep_days = config.getfloat('SETTINGS', 'keep_days', fallback=0)
+        watch_dir = config.get('SETTINGS', 'watch_dir', fallback=f'{self._curr_dir}/Watch/')
+
+        shows = list()
+        torrent_dirs = [f"{self._curr_dir}/Downloads/", watch_dir]
+        for item, dir_path in self._watchlist_patterns().values():
+            rules = parse_filter(config.get('FILTERS', item, fallback=''))
+            shows.append(ShowRetention(dir_path, normalize_show(item),
+                                       rules['keep'] if rules['keep'] is not None else keep or None,
+                                       rules['keep_days'] if rules['keep_days'] is not None else keep_days or None))
+            torrent_dirs.append(f"{watch_dir}{item.title()}/")
+
+        return shows, torrent_dirs, config.getfloat('SETTINGS', 'torrent_retention_days', fallback=14)
+
+    @staticmethod
+    def _cycle_report(pending, failed_links, record, dry_run=False, cancelled=False) -> dict:
+        """ The report of a cycle kept for get_last_cycle() """
+        matches = [{'feed' : feed.name, 'item' : item, 'title' : entry.title, 'link' : entry.link,
+                    'episode' : episode_label(parse_release(entry.title)),
+                    'delivered' : not (dry_run or cancelled) and entry.link not in failed_links}
+                   for entries in pending.values()
+                   for feed, entry_key, entry, matches in entries
+                   for item, dir_path in matches]
+
+        return {'dry_run' : dry_run, 'cancelled' : cancelled, 'matches' : matches, 'metrics' : record}
+
+    def _get_feeds(self) -> list:
+        """
+        Get the polled feeds: every 'name = url' pair in the FEEDS section, where an optional
+        section named after the (lowercased) feed overrides download_method, has_dots, must_contain and timeout.
+        Without a FEEDS section the single rss_link_magent/rss_link_torr feed of SETTINGS is used.
+        """
+        config = self._config
+        if len(config.items('FEEDS')):
+            sources = config.items('FEEDS')
+        else:
+            sources = [('SETTINGS', config.get('SETTINGS', 'rss_link_magent')
+                                    if config.get('SETTINGS', 'download_method') == 'magnet'
+                                    else config.get('SETTINGS', 'rss_link_torr'))]
+
+        feeds = list()
+        for name, url in sources:
+            feeds.append(Feed(name, url,
+                              config.get(name, 'download_method', fallback=config.get('SETTINGS', 'download_method')),
+                              config.getboolean(name, 'has_dots', fallback=config.getboolean('SETTINGS', 'has_dots')),
+                              config.get(name, 'must_contain', fallback=config.get('SETTINGS', 'must_contain')),
+                              config.getfloat(name, 'timeout',
+                                              fallback=config.getfloat('SETTINGS', 'feed_timeout', fallback=30.0))))
+
+        return feeds
+
+    def _fetch_feeds(self, feeds, matchers):
+        """
+        Fetches and parses all feeds concurrently, yielding (feed, scan_key, entries) for
+        every changed feed as soon as it arrives. Feeds that fail or exceed their timeout are skipped,
+        and so are feeds whose circuit breaker is open (see _fetch_body()).
+        """
+        import requests #fetch errors
+        futures = dict()
+        for feed in feeds:
+            scan_key = self._scan_key(feed, matchers)
+            futures[self._feed_pool.submit(self._fetch_feed, feed, scan_key)] = (feed, scan_key)
+
+        # only the fetches run against the deadline: the time the caller spends scanning the
+        # entries of a yielded feed passes while the others keep fetching, and what finished is collected
+        deadline = time.monotonic() + max([feed.timeout for feed in feeds], default=0)
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=max(0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+
+            for future in done:
+                feed, scan_key = futures[future]
+                try:
+                    entries = future.result()
+                except CircuitOpen:
+                    continue
+                except requests.RequestException as e:
+                    self._logger.error(f"Could not fetch {feed.url}: {e}")
+                    self._metrics.count('feed_errors')
+                    continue
+
+                # nothing changed since the last scan with this watchlist
+                if entries is None:
+                    self._metrics.count('feeds_unchanged')
+                else:
+                    yield feed, scan_key, entries
+
+        for future in pending:
+            feed, scan_key = futures[future]
+            self._logger.error(f"Timed out fetching {feed.url}")
+            self._metrics.count('feed_timeouts')
+
+    @staticmethod
+    def _scan_key(feed, matchers) -> str:
+        """ Identifies what a feed was scanned for, a changed watchlist or rule forces a rescan """
+        matcher_key = matchers[feed.has_dots].key
+        return hashlib.sha1(repr((matcher_key, feed.must_contain, feed.download_method)).encode()).hexdigest()
+
+    def _fetch_body(self, feed, scan_key):
+        """
+        Conditionally fetches feed, returns its body or None when it did not change since the last scan.
+
+        A feed failing feed_failure_threshold times in a row is skipped with an exponential backoff
+        before it is probed again. Meanwhile its last good body is scanned when the watchlist changed,
+        otherwise CircuitOpen is raised.
+        """
+        import requests #fetch errors
+        if not self._feed_health.allow(feed.url):
+            self._metrics.count('feeds_skipped')
+            retry_at = time.strftime('%H:%M:%S', time.localtime(self._feed_health.retry_at(feed.url)))
+            body = self._feed_cache.last_body(feed.url, scan_key)
+            if body is None:
+                self._logger.info(f"Skipping {feed.url} until {retry_at}")
+                raise CircuitOpen(feed.url)
+            self._logger.info(f"Scanning the last good body of {feed.url}, skipped until {retry_at}")
+            return body
+
+        start = time.perf_counter()
+        try:
+            with self._metrics.stage('feed_fetch'):
+                body = self._feed_cache.fetch(feed.url, scan_key, timeout=feed.timeout)
+        except requests.RequestException as e:
+            self._feed_health.record_failure(feed.url, time.perf_counter() - start, e)
+            raise
+        elapsed = time.perf_counter() - start
+        # a feed answering slower than its timeout stalls the cycle as much as a failing one
+        if elapsed > feed.timeout:
+            self._feed_health.record_failure(feed.url, elapsed, f"took {elapsed:.1f}s")
+        else:
+            self._feed_health.record_success(feed.url, elapsed)
+        if body is not None:
+            self._metrics.count('bytes_fetched', len(body))
+
+        return body
+
+    def _fetch_feed(self, feed, scan_key):
+        body = self._fetch_body(feed, scan_key)
+        if body is None:
+            return None
+
+        # entries are parsed lazily while matching, up to the newest entry of the previous scan
+        return self._timed_entries(iter_entries(body, stop_at=self._feed_cache.newest_id(feed.url, scan_key)))
+
+    def _timed_entries(self, entries):
+        """ Passes entries through, adding the time spent producing them to the parse stage """
+        entries = iter(entries)
+        while True:
+            start = time.perf_counter()
+            entry = next(entries, None)
+            self._metrics.add_time('parse', time.perf_counter() - start)
+            if entry is None:
+                return
+            yield entry
+
+    def _watchlist_patterns(self, has_dots: bool = False) -> dict:
+        """ Maps each watchlist item, as it appears in titles, to its (item, dir_path) """
+        patterns = dict()
+        for item, dir_path in self._config.items('WATCHLIST'):
+            if dir_path == '':
+                dir_path = f"{self._config.get('SETTINGS', 'download_dir')}{item.title()}/"
+
+            # for trackers that name their torrents with dots intsead of spaces,
+            # only the pattern is dotted, matches still report the watchlist item
+            pattern = item.replace(" ", ".") if has_dots else item
+            patterns[pattern] = (item, dir_path)
+
+        return patterns
+
+    def _get_matcher(self, has_dots: bool) -> CompiledWatchlist:
+        """
+        Get the compiled watchlist and its fingerprint,
+        rebuilding it only after the watchlist or settings changed
+        """
+        if has_dots not in self._matchers:
+            patterns = self._watchlist_patterns(has_dots)
+            filters = dict(self._config.items('FILTERS'))
+            exact = self._config.getboolean('SETTINGS', 'exact_match', fallback=True)
+
+            shows = dict()
+            for item, dir_path in patterns.values():
+                shows.setdefault(normalize_show(item), list()).append((item, dir_path))
+
+            matcher_key = hashlib.sha1(repr((sorted(patterns.items()), sorted(filters.items()), exact)).encode()).hexdigest()
+            rules = {item : parse_filter(text) for item, text in filters.items()}
+            self._matchers[has_dots] = CompiledWatchlist(WatchlistMatcher(patterns), matcher_key, shows, rules, exact)
+
+        return self._matchers[has_dots]
+
+    @staticmethod
+    def _match(watchlist: CompiledWatchlist, title: str) -> list:
+        """
+        Get the (item, dir_path) pairs an entry title belongs to.
+        Recognized release names are looked up by their exact show name and checked against
+        the item's FILTERS, anything else falls back to the substring matcher.
+        """
+        release = parse_release(title) if watchlist.exact else None
+        if release is None:
+            # one pass over the title finds every watchlist item it contains
+            return watchlist.matcher.match(title)
+
+        return [(item, dir_path) for item, dir_path in watchlist.shows.get(release.show, ())
+                if release_passes(release, watchlist.filters.get(item))]
+
+    def _episode_grabbed(self, item, release, cycle_episodes) -> bool:
+        """ Check whether item already got this episode, in an earlier cycle or earlier in this one """
+        show = normalize_show(item)
+        return cycle_episodes.get((show, release.season, release.episode), 0) >= release.version or \
+               self._ledger.has(show, release.season, release.episode, release.version)
+
+    @staticmethod
+    def _entry_key(entry) -> str:
+        """ The identity of a feed entry: its infohash if the tracker exposes it, else its GUID """
+        return entry.get('subsplease_infohash') or entry.get('id') or entry.title
+
+    @staticmethod
+    def _infohash(entry) -> str:
+        """ The lowercase hex infohash of an entry, from the feed or its magnet link, '' if unknown """
+        return normalize_infohash(entry.get('subsplease_infohash', '')) or infohash_from_magnet(entry.link)
         
-    def _check_rules(self, tracker, title):
-        must_contain = self._config.get(tracker, 'must_contain')
+    def _check_rules(self, must_contain, title):
         if must_contain != '':
             rules = must_contain.strip().split(",")
             for rule in rules:
@@ -207,29 +772,64 @@ class RSSDownloader:
 
         return True
 
-    def _qb_web(self, dir_path,link):
-        qbit_user = self._config.get('SETTINGS', 'qbit_user')
-        qbit_password = self._config.get('SETTINGS', 'qbit_password')
-        qbit_path = self._config.get('SETTINGS', 'qbit_path')
-        os.startfile(qbit_path)
-        qbit_found = False
-
-        #search for the qbit process to sync with qbit proc start
-        while not qbit_found:
-            for process in psutil.process_iter():
-                if 'qbittorrent' in process.name():
-                    #timeout is a cautionary param for when the qbit proc is up but the qbit webAPI isn't
-                    qb = Client(f"http://127.0.0.1:{self._config.get('SETTINGS', 'qbit_port')}/", timeout=3.0)
-                    if qb.login(qbit_user, qbit_password) != None:
-                        self._logger.error("Entered wrong qbittorrent username/password")
-                        return
-                    qb.download_from_link(link, savepath=(dir_path)) 
-                    qbit_found = True
-                    break        
-
-    def _dot_torr_download(self, link, title):
-        torr_download = requests.get(url=link, allow_redirects=True)
-
-        with open(f"{self._curr_dir}/Downloads/{title}.torrent", 'wb+') as torr_file:
-            torr_file.write(torr_download.content)
+    def _get_fetcher(self):
+        """ Get the shared .torrent fetcher, created on first use """
+        if self._fetcher is None:
+            from torrent_fetcher import TorrentFetcher #.torrent downloads
+            self._fetcher = TorrentFetcher(metrics=self._metrics)
+
+        return self._fetcher
+
+    def _get_torrent_cache(self):
+        """ Get the .torrent cache keyed by infohash, recreated only after the settings changed """
+        if self._torrent_cache is None:
+            self._torrent_cache = TorrentCache(f"{self._curr_dir}/.torrent_cache",
+                                               int(self._config.getfloat('SETTINGS', 'torrent_cache_mb', fallback=64) * 1024 * 1024),
+                                               self._metrics)
+
+        return self._torrent_cache
+
+    def _get_qbit(self):
+        """ Get the qBittorrent client, recreated only after the settings changed """
+        if self._qbit is None:
+            from qbit_client import QBitManager #qbitorrent web-UI API
+            self._qbit = QBitManager(self._config.get('SETTINGS', 'qbit_port'),
+                                     self._config.get('SETTINGS', 'qbit_user'),
+                                     self._config.get('SETTINGS', 'qbit_password'),
+                                     self._config.get('SETTINGS', 'qbit_path'))
 
+        return self._qbit
+
+    def _get_backend(self, download_method: str):
+        """
+        Get the delivery backend for the entries of a feed, recreated only after the settings changed.
+
+        delivery_backend picks 'watch_folder', 'qbit' or 'jsonrpc' for every feed, 'auto' keeps
+        adding magnet links through qBittorrent when it is integrated and saves everything else to Downloads/.
+        """
+        name = self._config.get('SETTINGS', 'delivery_backend', fallback='auto').strip().lower()
+        if name == 'auto':
+            qbit_magnet = download_method == 'magnet' and self._config.getboolean('SETTINGS', 'qbit_integration')
+            name = 'qbit' if qbit_magnet else 'downloads'
+
+        if name not in self._backends:
+            from delivery import WatchFolderBackend, QBitWebBackend, JsonRpcBackend #torrent client hand-off
+            if name == 'qbit':
+                backend = QBitWebBackend(self._get_qbit())
+            elif name == 'watch_folder':
+                backend = WatchFolderBackend(self._get_fetcher(),
+                                             self._config.get('SETTINGS', 'watch_dir', fallback=f'{self._curr_dir}/Watch/'),
+                                             self._config.getboolean('SETTINGS', 'watch_per_show', fallback=True),
+                                             self._get_torrent_cache(), self._seen)
+            elif name == 'jsonrpc':
+                backend = JsonRpcBackend(self._config.get('SETTINGS', 'rpc_url', fallback='http://localhost:6800/jsonrpc'),
+                                         self._config.get('SETTINGS', 'rpc_method', fallback='aria2.addUri'),
+                                         self._config.get('SETTINGS', 'rpc_token', fallback=''))
+            else:
+                if name != 'downloads':
+                    self._logger.warning(f"Unknown delivery_backend '{name}', saving .torrent files to Downloads/")
+                backend = WatchFolderBackend(self._get_fetcher(), f"{self._curr_dir}/Downloads/",
+                                             cache=self._get_torrent_cache(), seen=self._seen)
+            self._backends[name] = backend
+
+        return self._backends[name]
@@ -0,0 +1,124 @@
+import os #scan download dirs
+import time #timestamps
+import sqlite3 #persistence
+import threading #lock
+
+
+class SeenStore:
+
+    def __init__(self, path: str):
+        """
+        A persistent index of the feed entries that were already handled,
+        keyed by infohash or GUID, so deduplication is a set lookup
+        instead of filesystem checks.
+
+        Keys live in SQLite and are mirrored in an in-memory set, which is
+        reloaded when another process (the GUI, the bot, a cron run) committed to the database.
+
+        Methods
+        -------
+        add(key, title, item)
+            Marks an entry as seen
+
+        prune(max_age_days)
+            Forgets entries seen more than max_age_days ago
+
+        seed(dir_paths)
+            One time import of the names already in the download directories
+
+        match_times()
+            Get (item, timestamp) pairs of every entry matched by the downloader
+
+        last_matches()
+            Get {item: (title, timestamp)} of the newest match of every item
+        """
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS seen "
+                         "(key TEXT PRIMARY KEY, title TEXT, item TEXT, seen_at REAL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._db.commit()
+
+        self._data_version = None
+        self._keys = set()
+        self._refresh()
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            self._refresh()
+            return key in self._keys
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._keys)
+
+    def add(self, key: str, title: str = '', item: str = '') -> None:
+        """ Marks key as seen """
+        with self._lock:
+            self._keys.add(key)
+            self._db.execute("INSERT OR REPLACE INTO seen VALUES (?, ?, ?, ?)",
+                             (key, title, item, time.time()))
+            self._db.commit()
+
+    def prune(self, max_age_days: float) -> int:
+        """ Forgets entries older than max_age_days, returns how many were removed """
+        cutoff = time.time() - max_age_days * 24 * 60 * 60
+        with self._lock:
+            removed = [key for (key,) in self._db.execute("SELECT key FROM seen WHERE seen_at < ?", (cutoff,))]
+            self._db.execute("DELETE FROM seen WHERE seen_at < ?", (cutoff,))
+            self._db.commit()
+            self._keys.difference_update(removed)
+
+        return len(removed)
+
+    def match_times(self) -> list:
+        """ Get (item, timestamp) pairs of every remembered match, imported names excluded """
+        with self._lock:
+            return self._db.execute("SELECT item, seen_at FROM seen WHERE item != '' ORDER BY seen_at").fetchall()
+
+    def last_matches(self) -> dict:
+        """ Get {item: (title, timestamp)} of the newest entry matched for every item """
+        with self._lock:
+            # sqlite takes the bare title column from the row holding the MAX
+            rows = self._db.execute("SELECT item, title, MAX(seen_at) FROM seen WHERE item != '' GROUP BY item")
+            return {item : (title, seen_at) for item, title, seen_at in rows}
+
+    def seed(self, dir_paths) -> int:
+        """
+        Imports the file and directory names found in dir_paths as seen titles,
+        only on the first call for this store. '.torrent' suffixes are dropped.
+        Returns how many names were imported.
+        """
+        with self._lock:
+            if self._db.execute("SELECT value FROM meta WHERE name = 'seeded'").fetchone():
+                return 0
+
+            now = time.time()
+            names = set()
+            for dir_path in dir_paths:
+                if not os.path.isdir(dir_path):
+                    continue
+                with os.scandir(dir_path) as it:
+                    for dir_entry in it:
+                        name = dir_entry.name
+                        if name.endswith('.torrent'):
+                            name = name[:-len('.torrent')]
+                        names.add(name)
+
+            self._refresh()
+            names -= self._keys
+            self._db.executemany("INSERT OR IGNORE INTO seen VALUES (?, ?, '', ?)",
+                                 ((name, name, now) for name in names))
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('seeded', ?)", (str(now),))
+            self._db.commit()
+            self._keys.update(names)
+
+        return len(names)
+
+    def _refresh(self):
+        """ Reloads the keys if another connection committed since they were read, costs one pragma otherwise """
+        data_version = self._db.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self._keys = set(key for (key,) in self._db.execute("SELECT key FROM seen"))
+            self._data_version = data_version
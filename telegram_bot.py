@@ -1,15 +1,20 @@
+import asyncio
 import logging
 import sys
 from telegram import Update
 from telegram.ext import filters, Application, CommandHandler, ContextTypes, MessageHandler
 
-import rss_downloader
+import async_downloader
 
 
 logging.getLogger("httpx").setLevel(logging.WARNING)
 
 logger = logging.getLogger(__name__)
 
+async def run_blocking(func, *args):
+    """Runs a blocking downloader call on the default executor so other updates keep flowing."""
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     await update.message.reply_text("""Please choose one of the following commands:
     /start - Shows available commands.
@@ -19,6 +24,8 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     /download - Download new items from RSS.
     
     /watchlist - See wathclist
+
+    /progress - See the episodes grabbed for every item
    
     /additem - Add item to watchlist,
                must provide an item name after command.
@@ -34,7 +41,8 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     await update.message.reply_text("Use /start to see all commands this bot can execute.")
 
 async def download_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    downloaded_item_list = rss_downloader.RSSDownloader().download()
+    # the async engine runs the cycle on the bot's own event loop
+    downloaded_item_list = await context.bot_data['downloader'].download()
     output = "No items"
     
     if downloaded_item_list:
@@ -43,26 +51,31 @@ async def download_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     await update.message.reply_text(f"{output} Added to qBittorrent")
 
 async def add_item_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    downloader = rss_downloader.RSSDownloader()
+    downloader = context.bot_data['downloader']
     if not context.args:
         await update.message.reply_text("Please provide an item name after /additem")
     else:
-        downloader.add_item_to_watchlist(item=' '.join(context.args))
+        await run_blocking(downloader.add_item_to_watchlist, ' '.join(context.args))
         await update.message.reply_text(f"Added {' '.join(context.args)} to watchlist")
     
 async def remove_item_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    downloader = rss_downloader.RSSDownloader()
+    downloader = context.bot_data['downloader']
     if not context.args:
         await update.message.reply_text("Please provide an item name after /remove")
-    elif downloader.remove_item_from_watchlist(item=' '.join(context.args)):
+    elif await run_blocking(downloader.remove_item_from_watchlist, ' '.join(context.args)):
         await update.message.reply_text(f"Removed {' '.join(context.args)} from watchlist")
     else:
         await update.message.reply_text(f"{' '.join(context.args)} is not in watchlist")
 
 async def get_wathclist_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    watchlist = '\n'.join(rss_downloader.RSSDownloader().get_watchlist())
+    watchlist = '\n'.join(context.bot_data['downloader'].get_watchlist())
     await update.message.reply_text(f"{watchlist}")
 
+async def progress_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    downloader = context.bot_data['downloader']
+    lines = [f"{item}: {downloader.get_progress_text(item) or 'nothing yet'}" for item in downloader.get_watchlist()]
+    await update.message.reply_text('\n'.join(lines) or "Watchlist is empty")
+
 async def exit_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     sys.exit()
 
@@ -70,15 +83,20 @@ async def general_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("I am a bot. Bip boop.")
 
 def bot():
-    TOKEN = rss_downloader.RSSDownloader().get_telegram_token()
+    # one downloader for the whole bot, it picks up config.ini changes made by the GUI on its own
+    downloader = async_downloader.AsyncRSSDownloader()
+    TOKEN = downloader.get_telegram_token()
     application = Application.builder().token(TOKEN).build()
+    application.bot_data['downloader'] = downloader
     
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("help", help_command))
-    application.add_handler(CommandHandler("download", download_command))
+    # a cycle takes a while, other updates are handled meanwhile (overlapping cycles queue up in the downloader)
+    application.add_handler(CommandHandler("download", download_command, block=False))
     application.add_handler(CommandHandler("additem",add_item_command))
     application.add_handler(CommandHandler("remove",remove_item_command))
     application.add_handler(CommandHandler("watchlist",get_wathclist_command))
+    application.add_handler(CommandHandler("progress",progress_command))
     application.add_handler(CommandHandler("exit", exit_command))
     application.add_handler(MessageHandler(filters.TEXT & (~filters.COMMAND), general_text))
 
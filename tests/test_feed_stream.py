@@ -0,0 +1,80 @@
+import feed_stream
+from feed_stream import iter_entries
+
+RSS = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0" xmlns:subsplease="https://subsplease.org/rss">
+<channel><title>Feed</title>
+<item><title>[Group] Show - 03 (1080p)</title><link>https://example.org/3.torrent</link>
+<guid isPermaLink="false">guid-3</guid><subsplease:infohash>AAA3</subsplease:infohash></item>
+<item><title>[Group] Show - 02 (1080p)</title><link>https://example.org/2.torrent</link><guid>guid-2</guid></item>
+<item><title>[Group] Show - 01 (1080p)</title><link>https://example.org/1.torrent</link><guid>guid-1</guid></item>
+</channel></rss>"""
+
+ATOM = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom"><title>Feed</title>
+<entry><title>[Group] Show - 02 (1080p)</title><link href="https://example.org/2.torrent"/><id>urn:2</id></entry>
+<entry><title>[Group] Show - 01 (1080p)</title><link href="https://example.org/1.torrent"/><id>urn:1</id></entry>
+</feed>"""
+
+RDF = b"""<?xml version="1.0"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" xmlns="http://purl.org/rss/1.0/">
+<channel rdf:about="https://example.org/"><title>Feed</title></channel>
+<item rdf:about="https://example.org/2.torrent"><title>[Group] Show - 02 (1080p)</title><link>https://example.org/2.torrent</link></item>
+<item rdf:about="https://example.org/1.torrent"><title>[Group] Show - 01 (1080p)</title><link>https://example.org/1.torrent</link></item>
+</rdf:RDF>"""
+
+
+def test_rss():
+    entries = list(iter_entries(RSS))
+    assert [entry.id for entry in entries] == ['guid-3', 'guid-2', 'guid-1']
+    assert entries[0].title == '[Group] Show - 03 (1080p)'
+    assert entries[0].link == 'https://example.org/3.torrent'
+    assert entries[0].subsplease_infohash == 'AAA3'
+    assert entries[1].get('subsplease_infohash') is None
+
+
+def test_rss_uppercase_names():
+    entries = list(iter_entries(RSS.replace(b'<item>', b'<ITEM>').replace(b'</item>', b'</ITEM>')))
+    assert [entry.id for entry in entries] == ['guid-3', 'guid-2', 'guid-1']
+
+
+def test_atom():
+    entries = list(iter_entries(ATOM))
+    assert [(entry.title, entry.link, entry.id) for entry in entries] == [
+        ('[Group] Show - 02 (1080p)', 'https://example.org/2.torrent', 'urn:2'),
+        ('[Group] Show - 01 (1080p)', 'https://example.org/1.torrent', 'urn:1')]
+
+
+def test_rdf():
+    entries = list(iter_entries(RDF))
+    assert [entry.link for entry in entries] == ['https://example.org/2.torrent', 'https://example.org/1.torrent']
+
+
+def test_stop_at():
+    assert [entry.id for entry in iter_entries(RSS, stop_at='guid-2')] == ['guid-3']
+    assert [entry.id for entry in iter_entries(ATOM, stop_at='urn:1')] == ['urn:2']
+    # nothing new since the newest entry of the last scan
+    assert list(iter_entries(RSS, stop_at='guid-3')) == []
+
+
+def test_stops_parsing_at_stop_at():
+    # everything past the entry of the last scan is not parsed, so damage there goes unnoticed
+    body = RSS.replace(b'</channel></rss>', b'<item><title>broken</title></channel>')
+    assert [entry.id for entry in iter_entries(body, stop_at='guid-1')] == ['guid-3', 'guid-2']
+
+
+def test_unknown_format_falls_back_to_feedparser(monkeypatch):
+    calls = list()
+    monkeypatch.setattr(feed_stream, '_feedparser_entries', lambda body, skip, stop_at: calls.append(skip) or iter(()))
+    body = RSS.replace(b'<item>', b'<story>').replace(b'</item>', b'</story>')
+    assert list(iter_entries(body)) == []
+    assert calls == [0]
+
+    # a feed whose newest entry was already scanned has nothing to fall back for
+    assert list(iter_entries(RSS, stop_at='guid-3')) == []
+    assert calls == [0]
+
+
+def test_malformed_falls_back_to_feedparser():
+    body = RSS.replace(b'</channel></rss>', b'<item><title>[Group] Show - 00</title><guid>guid-0</guid>')
+    assert [entry.id for entry in iter_entries(body)] == ['guid-3', 'guid-2', 'guid-1', 'guid-0']
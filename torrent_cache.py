@@ -0,0 +1,181 @@
+import os #cache files, atomic replace
+import re #magnet links
+import base64 #base32 infohashes
+import hashlib #infohash
+import threading #lock
+from urllib.parse import urlsplit, parse_qs #magnet links
+
+_BTIH = re.compile(r"^urn:btih:([0-9a-fA-F]{40}|[A-Za-z2-7]{32})$")
+_HEX = re.compile(r"^[0-9a-fA-F]{40}$")
+
+
+def infohash_from_magnet(link: str) -> str:
+    """ The lowercase hex infohash in the xt parameter of a magnet link, '' if there is none """
+    if not link.startswith('magnet:'):
+        return ''
+
+    for topic in parse_qs(urlsplit(link).query).get('xt', []):
+        match = _BTIH.match(topic)
+        if match:
+            infohash = match.group(1)
+            if len(infohash) == 32:
+                infohash = base64.b32decode(infohash.upper()).hex()
+            return infohash.lower()
+
+    return ''
+
+
+def normalize_infohash(infohash: str) -> str:
+    """ infohash as lowercase hex, '' when it is not a 40 character hex string """
+    infohash = (infohash or '').strip()
+    return infohash.lower() if _HEX.match(infohash) else ''
+
+
+def infohash_from_torrent(body: bytes) -> str:
+    """ The hex SHA-1 of the bencoded info dictionary of a .torrent body, '' if it has none """
+    try:
+        if body[:1] != b'd':
+            return ''
+        i = 1
+        while body[i:i + 1] != b'e':
+            key_end = _skip(body, i)
+            key = body[body.index(b':', i) + 1:key_end]
+            value_end = _skip(body, key_end)
+            if key == b'info':
+                return hashlib.sha1(body[key_end:value_end]).hexdigest()
+            i = value_end
+    except (ValueError, IndexError):
+        pass
+
+    return ''
+
+
+def _skip(body: bytes, i: int) -> int:
+    """ The index just past the bencoded value starting at i """
+    kind = body[i:i + 1]
+    if kind == b'i':
+        return body.index(b'e', i) + 1
+    if kind in (b'l', b'd'):
+        i += 1
+        while body[i:i + 1] != b'e':
+            if i >= len(body):
+                raise ValueError("unterminated bencoded container")
+            i = _skip(body, i)
+        return i + 1
+    if kind.isdigit():
+        colon = body.index(b':', i)
+        return colon + 1 + int(body[i:colon])
+
+    raise ValueError(f"invalid bencoded value at {i}")
+
+
+class TorrentCache:
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, metrics=None):
+        """
+        A content-addressed cache of .torrent files keyed by infohash, so one payload
+        is fetched once no matter how many feeds, resolutions or titles announce it.
+
+        Files live in path as '<infohash[:2]>/<infohash>.torrent'. Once they add up to more
+        than max_bytes the least recently used are evicted. With metrics (see metrics.py)
+        cache hits are counted as torrent_cache_hits.
+
+        Methods
+        -------
+        copy_to(infohash, dest_path)
+            Writes the cached torrent to dest_path, False on a cache miss
+
+        add_file(source_path)
+            Caches a fetched .torrent file, returns its infohash
+        """
+        self._path = path
+        self._max_bytes = max_bytes
+        self._metrics = metrics
+        self._lock = threading.Lock()
+        # infohash -> (last use, size), rebuilt from the files on start
+        self._entries = dict()
+        self._size = 0
+
+        os.makedirs(path, exist_ok=True)
+        for shard in os.scandir(path):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.torrent'):
+                    stat = entry.stat()
+                    self._entries[entry.name[:-len('.torrent')]] = (stat.st_mtime, stat.st_size)
+                    self._size += stat.st_size
+
+    def __contains__(self, infohash) -> bool:
+        return normalize_infohash(infohash) in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def copy_to(self, infohash: str, dest_path: str) -> bool:
+        """ Writes the cached torrent of infohash to dest_path (temp file, then rename), False if not cached """
+        infohash = normalize_infohash(infohash)
+        with self._lock:
+            if infohash not in self._entries:
+                return False
+            source_path = self._file(infohash)
+            try:
+                with open(source_path, 'rb') as source:
+                    body = source.read()
+                # the access time decides eviction, kept in the mtime so it survives restarts
+                os.utime(source_path)
+            except OSError:
+                self._forget(infohash)
+                return False
+            self._entries[infohash] = (os.path.getmtime(source_path), len(body))
+
+        _write_atomic(dest_path, body)
+        if self._metrics is not None:
+            self._metrics.count('torrent_cache_hits')
+        return True
+
+    def add_file(self, source_path: str) -> str:
+        """ Caches the .torrent file at source_path, returns its infohash ('' if it is not a valid torrent) """
+        with open(source_path, 'rb') as source:
+            body = source.read()
+        infohash = infohash_from_torrent(body)
+        if not infohash:
+            return ''
+
+        with self._lock:
+            if infohash not in self._entries:
+                dest_path = self._file(infohash)
+                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                _write_atomic(dest_path, body)
+                self._entries[infohash] = (os.path.getmtime(dest_path), len(body))
+                self._size += len(body)
+                self._evict()
+
+        return infohash
+
+    def _file(self, infohash):
+        return f"{self._path}/{infohash[:2]}/{infohash}.torrent"
+
+    def _forget(self, infohash):
+        used, size = self._entries.pop(infohash)
+        self._size -= size
+
+    def _evict(self):
+        if self._size <= self._max_bytes:
+            return
+
+        for infohash, (used, size) in sorted(self._entries.items(), key=lambda entry: entry[1][0]):
+            if self._size <= self._max_bytes:
+                break
+            try:
+                os.remove(self._file(infohash))
+            except OSError:
+                pass
+            self._forget(infohash)
+
+
+def _write_atomic(dest_path, body):
+    tmp_path = f"{dest_path}.part"
+    with open(tmp_path, 'wb') as dest:
+        dest.write(body)
+    os.replace(tmp_path, dest_path)
@@ -0,0 +1,74 @@
+from collections import deque #BFS over the trie
+
+
+class WatchlistMatcher:
+
+    def __init__(self, patterns: dict):
+        """
+        Compile a set of watchlist patterns into an Aho-Corasick automaton,
+        so every title is scanned once no matter how many items are watched.
+
+        Parameters
+        ----------
+        patterns : dict
+            maps a lowercased pattern (the text looked for inside titles)
+            to the value returned when it is found, e.g. (item, dir_path)
+
+        Methods
+        -------
+        match(title)
+            Returns the values of every pattern found in the title
+        """
+        self._goto = [dict()]
+        self._fail = [0]
+        self._out = [list()]
+
+        for pattern, value in patterns.items():
+            if pattern == '':
+                continue
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append(dict())
+                    self._fail.append(0)
+                    self._out.append(list())
+                state = next_state
+            self._out[state].append(value)
+
+        self._build_fail_links()
+
+    def __len__(self):
+        return sum(len(out) for out in self._out)
+
+    def _build_fail_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                # inherit the matches of the longest proper suffix
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def match(self, title: str) -> list:
+        """ Returns the values of every pattern contained in title (lowercased), each at most once """
+        goto, fail, out = self._goto, self._fail, self._out
+        found = list()
+        seen_states = set()
+        state = 0
+        for char in title.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state] and state not in seen_states:
+                seen_states.add(state)
+                found.extend(out[state])
+
+        # a pattern can be reported by several states, keep the first hit only
+        return list(dict.fromkeys(found))